@@ -0,0 +1,293 @@
+"""
+Load benchmark for the API against a local Replicate stand-in
+
+Boots server.py and replicate_stub.py in this process (each on its own
+loopback port), seeds projects and executions, then drives concurrent
+workloads and reports p50/p95/p99 latency and requests/sec. MongoDB is an
+in-memory mongomock database unless --mongo-url points at a real server, in
+which case a throwaway database is used and dropped afterwards. Run from the
+backend directory:
+
+    pip install -r requirements-bench.txt
+    python bench_api.py --concurrency 32 --duration 10
+    python bench_api.py --compare bench_results/<earlier run>.json
+
+Results are written as JSON to bench_results/ for comparing runs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+
+WORKLOADS = ("execute", "stream", "projects", "project")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors, elapsed, first_tokens=None):
+    latencies = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1] if latencies else None),
+            "mean": ms(sum(latencies) / len(latencies) if latencies else None)
+        }
+    }
+    if first_tokens is not None:
+        first_tokens = sorted(first_tokens)
+        summary["first_token_ms"] = {
+            "p50": ms(percentile(first_tokens, 0.50)),
+            "p95": ms(percentile(first_tokens, 0.95)),
+            "p99": ms(percentile(first_tokens, 0.99))
+        }
+    return summary
+
+async def start_server(app, port):
+    """Serve an ASGI app on loopback from the running event loop"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    # The harness owns Ctrl-C; uvicorn must not install its own handlers
+    server.install_signal_handlers = lambda: None
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+async def stop_server(server, task):
+    server.should_exit = True
+    await task
+
+class Workload:
+    """One kind of request, issued by ``concurrency`` workers for a fixed time"""
+
+    def __init__(self, name, http, project_ids):
+        self.name = name
+        self.http = http
+        self.project_ids = project_ids
+        self.counter = 0
+
+    def next_prompt(self):
+        # Unique prompts keep the result cache from answering for the model
+        self.counter += 1
+        return f"bench {self.name} {self.counter} {uuid.uuid4().hex[:8]}"
+
+    async def request(self):
+        """Issue one request; return (seconds to first token or None)"""
+        if self.name == "execute":
+            response = await self.http.post("/api/tools/execute", json={
+                "tool_name": "Script Writer",
+                "inputs": {"prompt": self.next_prompt()},
+                "project_id": self.project_ids[self.counter % len(self.project_ids)]
+            })
+            response.raise_for_status()
+        elif self.name == "stream":
+            start = time.perf_counter()
+            first_token = None
+            async with self.http.stream("POST", "/api/tools/execute/stream", json={
+                "tool_name": "Brainstorm Ideas",
+                "inputs": {"prompt": self.next_prompt()}
+            }) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: token":
+                        first_token = time.perf_counter() - start
+                    elif line == "event: error":
+                        raise RuntimeError("stream reported an error")
+            return first_token
+        elif self.name == "projects":
+            response = await self.http.get("/api/projects", params={"limit": 50})
+            response.raise_for_status()
+        elif self.name == "project":
+            self.counter += 1
+            project_id = self.project_ids[self.counter % len(self.project_ids)]
+            response = await self.http.get(f"/api/projects/{project_id}", params={"limit": 50})
+            response.raise_for_status()
+        return None
+
+    async def run(self, concurrency, duration):
+        latencies, first_tokens, errors = [], [], {}
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    first_token = await self.request()
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if first_token is not None:
+                    first_tokens.append(first_token)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return summarize(latencies, errors, elapsed, first_tokens if self.name == "stream" else None)
+
+async def seed(server, http, projects, executions_per_project):
+    """Create projects through the API and give each a page of executions"""
+    project_ids = []
+    for index in range(projects):
+        response = await http.post("/api/projects", json={
+            "name": f"Bench project {index}",
+            "description": "Seeded by bench_api.py",
+            "tools_used": ["Script Writer"]
+        })
+        response.raise_for_status()
+        project_ids.append(response.json()["project"]["id"])
+
+    records = [
+        {
+            "id": str(uuid.uuid4()),
+            "tool_name": "Script Writer",
+            "inputs": {"prompt": f"Seed scene {index}"},
+            "result": "FADE IN:\n\nEXT. ROOFTOP - NIGHT\n\n" + "Rain hammers the skyline. " * 20,
+            "result_media": None,
+            "project_id": project_id,
+            "created_at": datetime.now(timezone.utc),
+            "is_demo": False
+        }
+        for project_id in project_ids
+        for index in range(executions_per_project)
+    ]
+    if records:
+        await server.db.executions.insert_many(records)
+    return project_ids
+
+def print_report(results, baseline=None):
+    print(f"\n{'workload':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, summary in results["workloads"].items():
+        latency = summary["latency_ms"]
+        fmt = lambda value: f"{value:9.1f}" if value is not None else f"{'-':>9}"
+        print(f"{name:<10} {summary['rps']:9.1f} {fmt(latency['p50'])} {fmt(latency['p95'])} "
+              f"{fmt(latency['p99'])} {sum(summary['errors'].values()):>7}")
+        if "first_token_ms" in summary:
+            print(f"{'  ttft':<10} {'':>9} {fmt(summary['first_token_ms']['p50'])} "
+                  f"{fmt(summary['first_token_ms']['p95'])} {fmt(summary['first_token_ms']['p99'])}")
+        previous = (baseline or {}).get("workloads", {}).get(name)
+        if previous and previous["rps"] and previous["latency_ms"]["p95"]:
+            rps_change = (summary["rps"] / previous["rps"] - 1) * 100
+            p95_change = (latency["p95"] / previous["latency_ms"]["p95"] - 1) * 100
+            print(f"{'  vs base':<10} {rps_change:+8.1f}% {'':>9} {p95_change:+8.1f}%")
+
+async def main(args):
+    stub_port, api_port = free_port(), free_port()
+    media_root = tempfile.mkdtemp(prefix="bench-media-")
+    # server.py reads its settings at import time
+    os.environ.update({
+        "REPLICATE_API_TOKEN": "bench",
+        "REPLICATE_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "REPLICATE_POLL_INTERVAL": str(args.poll_interval),
+        "MONGO_URL": args.mongo_url or "mongodb://localhost:27017",
+        "DATABASE_NAME": f"bench_{uuid.uuid4().hex[:8]}",
+        "MEDIA_ROOT": media_root,
+        "TOOLS_CONFIG_FILE": ""
+    })
+
+    import replicate_stub
+    replicate_stub.STUB_LATENCY = args.latency
+    replicate_stub.STUB_STREAM = not args.no_stream
+    replicate_stub.STUB_STREAM_INTERVAL = args.stream_interval
+
+    import server
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("In-memory Mongo needs mongomock-motor: pip install -r requirements-bench.txt")
+        server.client = AsyncMongoMockClient(tz_aware=True)
+        server.db = server.client[os.environ["DATABASE_NAME"]]
+        server.result_cache.collection = server.db.result_cache
+
+    stub = await start_server(replicate_stub.app, stub_port)
+    api = await start_server(server.app, api_port)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    http = httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", limits=limits, timeout=60)
+    try:
+        project_ids = await seed(server, http, args.projects, args.executions)
+        results = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "latency": args.latency,
+                "stream": not args.no_stream,
+                "stream_interval": args.stream_interval,
+                "poll_interval": args.poll_interval,
+                "projects": args.projects,
+                "executions_per_project": args.executions,
+                "mongo": "real" if args.mongo_url else "mongomock"
+            },
+            "workloads": {}
+        }
+        for name in args.workloads:
+            print(f"Running {name} for {args.duration:.0f}s at concurrency {args.concurrency}...")
+            results["workloads"][name] = await Workload(name, http, project_ids).run(args.concurrency, args.duration)
+        results["stats"] = (await http.get("/api/stats")).json()
+    finally:
+        await http.aclose()
+        await stop_server(*api)
+        await stop_server(*stub)
+        if args.mongo_url:
+            await server.client.drop_database(os.environ["DATABASE_NAME"])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(
+        "bench_results", f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load benchmark for the AI Filmmaking Platform API")
+    parser.add_argument("--workloads", type=lambda value: value.split(","), default=list(WORKLOADS),
+                        help=f"comma-separated subset of {','.join(WORKLOADS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per workload")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run each workload")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub prediction time in seconds")
+    parser.add_argument("--no-stream", action="store_true", help="stub predictions offer no stream URL")
+    parser.add_argument("--stream-interval", type=float, default=0.02, help="stub seconds between streamed tokens")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="REPLICATE_POLL_INTERVAL for the API")
+    parser.add_argument("--projects", type=int, default=20, help="projects to seed")
+    parser.add_argument("--executions", type=int, default=100, help="executions to seed per project")
+    parser.add_argument("--mongo-url", help="use this MongoDB server instead of an in-memory one")
+    parser.add_argument("--output", help="results file (default bench_results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
@@ -0,0 +1,105 @@
+"""
+Benchmark for rendering MongoDB documents as API responses
+
+Compares the old path (serialize_doc rebuilding every document, then
+FastAPI's jsonable_encoder and json.dumps) with MongoJSONResponse rendering
+documents fetched with ``_id`` projected out. Timestamps are real UTC
+datetimes, as Motor returns them; MongoJSONResponse writes them with a "Z"
+suffix rather than "+00:00", so its payload is 10 bytes per document
+smaller. Run from the backend directory:
+
+    python bench_serialize.py --docs 10000 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+# server.py reads these at import time; no connection is made
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "ai_filmmaking_db")
+
+from server import MongoJSONResponse
+
+def serialize_doc(doc):
+    """The recursive serializer MongoJSONResponse replaced"""
+    if doc is None:
+        return None
+    if isinstance(doc, list):
+        return [serialize_doc(item) for item in doc]
+    if isinstance(doc, dict):
+        result = {}
+        for key, value in doc.items():
+            if key == "_id":
+                continue
+            elif isinstance(value, ObjectId):
+                result[key] = str(value)
+            elif isinstance(value, dict):
+                result[key] = serialize_doc(value)
+            elif isinstance(value, list):
+                result[key] = serialize_doc(value)
+            else:
+                result[key] = value
+        return result
+    return doc
+
+def render_legacy(docs):
+    content = jsonable_encoder({"executions": serialize_doc(docs), "next_cursor": None})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def render_current(docs):
+    return MongoJSONResponse({"executions": docs, "next_cursor": None}).body
+
+def make_execution(index, project_id, with_id):
+    """An execution document shaped like the ones store_execution writes"""
+    created_at = datetime.now(timezone.utc)
+    doc = {
+        "id": str(uuid.uuid4()),
+        "tool_name": "Script Writer",
+        "inputs": {"prompt": f"Scene {index}: a chase across rooftops", "system_prompt": "You are a screenwriter"},
+        "result": "FADE IN:\n\nEXT. ROOFTOP - NIGHT\n\n" + "Rain hammers the skyline. " * 20,
+        "result_media": {"hash": "0" * 64, "content_type": "image/png", "size": 48213} if index % 4 == 0 else None,
+        "project_id": project_id,
+        "created_at": created_at,
+        "is_demo": True,
+        # Set when DEMO_EXECUTION_TTL is; a day here
+        "expires_at": created_at + timedelta(days=1)
+    }
+    if with_id:
+        doc["_id"] = ObjectId()
+    return doc
+
+def best_of(rounds, fn, docs):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = fn(docs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10000, help="documents per payload")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per path (best is reported)")
+    args = parser.parse_args()
+
+    project_id = str(uuid.uuid4())
+    # The old path fetched _id and dropped it in Python; the new one projects it out
+    fetched = [make_execution(i, project_id, with_id=True) for i in range(args.docs)]
+    projected = [make_execution(i, project_id, with_id=False) for i in range(args.docs)]
+
+    legacy, legacy_size = best_of(args.rounds, render_legacy, fetched)
+    current, current_size = best_of(args.rounds, render_current, projected)
+    print(f"{args.docs} documents, best of {args.rounds} rounds")
+    print(f"  serialize_doc + json     {legacy * 1000:9.1f} ms  {legacy_size:>10} bytes")
+    print(f"  MongoJSONResponse        {current * 1000:9.1f} ms  {current_size:>10} bytes")
+    print(f"  speedup                  {legacy / current:9.1f}x")
+
+if __name__ == "__main__":
+    main()
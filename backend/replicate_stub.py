@@ -0,0 +1,133 @@
+"""
+Local stand-in for the Replicate predictions API
+
+Implements just enough of /v1/predictions for server.py to run offline:
+create, get and cancel, with predictions completing after a configurable
+delay, an optional completion webhook and an SSE stream URL that emits
+tokens as they are "generated". Point the backend at it with
+REPLICATE_BASE_URL=http://localhost:8010 and any non-empty token.
+
+    uvicorn replicate_stub:app --port 8010
+"""
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import os
+import time
+import uuid
+import httpx
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "2.0"))
+STUB_FAIL_PROMPT = os.getenv("STUB_FAIL_PROMPT", "fail")
+# Offer a stream URL on new predictions, polled this often for new tokens
+STUB_STREAM = os.getenv("STUB_STREAM", "true").lower() == "true"
+STUB_STREAM_INTERVAL = float(os.getenv("STUB_STREAM_INTERVAL", "0.05"))
+
+app = FastAPI(title="Replicate API stub")
+
+predictions = {}
+
+def stub_output(inputs):
+    """Echo the prompt back as a list of tokens, like an LLM would"""
+    prompt = str(inputs.get("prompt") or inputs.get("text") or "stub output")
+    return [word + " " for word in f"Stub response to: {prompt}".split()]
+
+def render(prediction):
+    """Advance a prediction according to elapsed time and return its JSON"""
+    if prediction["status"] in ("starting", "processing"):
+        elapsed = time.monotonic() - prediction["started"]
+        tokens = prediction["tokens"]
+        if elapsed >= STUB_LATENCY:
+            if STUB_FAIL_PROMPT and prediction["input"].get("prompt") == STUB_FAIL_PROMPT:
+                prediction["status"] = "failed"
+                prediction["error"] = "Stub prediction failed"
+            else:
+                prediction["status"] = "succeeded"
+                prediction["output"] = tokens
+        else:
+            prediction["status"] = "processing"
+            prediction["output"] = tokens[:int(len(tokens) * elapsed / STUB_LATENCY)]
+    return {key: value for key, value in prediction.items() if key not in ("started", "tokens")}
+
+async def deliver_webhook(prediction_id):
+    """POST the finished prediction to its webhook, if one was given"""
+    prediction = predictions[prediction_id]
+    await asyncio.sleep(STUB_LATENCY)
+    payload = render(prediction)
+    async with httpx.AsyncClient() as client:
+        try:
+            await client.post(prediction["webhook"], json=payload)
+        except httpx.HTTPError:
+            pass
+
+@app.post("/v1/predictions", status_code=201)
+async def create_prediction(body: dict, request: Request):
+    prediction_id = uuid.uuid4().hex
+    prediction = {
+        "id": prediction_id,
+        "model": "stub/model",
+        "version": body.get("version"),
+        "input": body.get("input") or {},
+        "status": "starting",
+        "output": None,
+        "error": None,
+        "logs": "",
+        "metrics": {},
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "webhook": body.get("webhook"),
+        "urls": {
+            "get": f"/v1/predictions/{prediction_id}",
+            "cancel": f"/v1/predictions/{prediction_id}/cancel"
+        },
+        "started": time.monotonic(),
+        "tokens": stub_output(body.get("input") or {})
+    }
+    if STUB_STREAM and body.get("stream"):
+        prediction["urls"]["stream"] = f"{str(request.base_url).rstrip('/')}/v1/predictions/{prediction_id}/stream"
+    predictions[prediction_id] = prediction
+    if prediction["webhook"]:
+        asyncio.create_task(deliver_webhook(prediction_id))
+    return render(prediction)
+
+@app.get("/v1/predictions/{prediction_id}")
+async def get_prediction(prediction_id: str):
+    prediction = predictions.get(prediction_id)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    return render(prediction)
+
+@app.post("/v1/predictions/{prediction_id}/cancel")
+async def cancel_prediction(prediction_id: str):
+    prediction = predictions.get(prediction_id)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    render(prediction)
+    if prediction["status"] in ("starting", "processing"):
+        prediction["status"] = "canceled"
+    return render(prediction)
+
+@app.get("/v1/predictions/{prediction_id}/stream")
+async def stream_prediction(prediction_id: str):
+    prediction = predictions.get(prediction_id)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+
+    async def events():
+        sent = 0
+        while True:
+            current = render(prediction)
+            output = current["output"] or []
+            for token in output[sent:]:
+                yield f"event: output\ndata: {token}\n\n"
+            sent = len(output)
+            if current["status"] == "failed":
+                yield f"event: error\ndata: {current['error']}\n\n"
+                return
+            if current["status"] in ("succeeded", "canceled"):
+                reason = "canceled" if current["status"] == "canceled" else ""
+                yield f'event: done\ndata: {{"reason": "{reason}"}}\n\n'
+                return
+            await asyncio.sleep(STUB_STREAM_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -1,45 +1,404 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from starlette.datastructures import MutableHeaders
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import AfterValidator, BaseModel, ConfigDict, PlainSerializer, StrictInt, StrictStr, StringConstraints, ValidationError, create_model
+from typing import Annotated, Any, Dict, Optional, List
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+import asyncio
+import bisect
+import functools
+import hashlib
+import io
+import multiprocessing
 import os
+import re
+import socket
+import time
 import uuid
+import zlib
 import replicate
+from replicate.exceptions import ModelError
 from dotenv import load_dotenv
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
 import base64
+import gzip
+import logging
 import httpx
 import json
-from bson import ObjectId
+import orjson
+from bson import ObjectId, encode as bson_encode
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, ExecutionTimeout, OperationFailure, WTimeoutError
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are only gzip-compressed
+    brotli = None
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Optional: without it images are only served at full size
+    Image = None
 
 load_dotenv()
 
-# Helper function to convert MongoDB documents to JSON serializable format
-def serialize_doc(doc):
-    """Convert MongoDB document to JSON serializable format"""
-    if doc is None:
+logger = logging.getLogger("ai_filmmaking")
+
+# Metrics
+# Prometheus text-format counters and histograms served from /metrics.
+# Recording is a dict lookup and a bisect, and a no-op when disabled.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+metric_families = []
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+        metric_families.append(self)
+
+    def inc(self, *label_values, amount=1):
+        if METRICS_ENABLED:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self.series = {}
+        metric_families.append(self)
+
+    def observe(self, value, *label_values):
+        if not METRICS_ENABLED:
+            return
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *label_values):
+        return HistogramTimer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = format_labels(self.labels, label_values, [("le", bound)])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+class HistogramTimer:
+    """Observe elapsed time on exit; usable in both ``with`` and ``async with``"""
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        self.__exit__(*exc_info)
+
+def render_metrics():
+    lines = []
+    for family in metric_families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+TOOL_EXECUTIONS = Counter("tool_executions_total", "Execution records written, by tool and mode", ("tool", "mode"))
+TOOL_ERRORS = Counter("tool_errors_total", "Failed tool executions by tool and exception type", ("tool", "error"))
+TOOL_RUN_SECONDS = Histogram("tool_run_seconds", "Time to produce a tool result, including queueing and cache lookups", ("tool", "model"))
+TOOL_RESULT_BYTES = Histogram("tool_result_bytes", "Size of stored tool results", ("tool",), SIZE_BUCKETS)
+SCHEDULER_WAIT_SECONDS = Histogram("scheduler_queue_wait_seconds", "Time spent waiting for a model slot", ("model",))
+PREDICTION_SECONDS = Histogram("replicate_prediction_seconds", "Replicate prediction time once a slot is held", ("model",))
+MONGO_SECONDS = Histogram("mongo_operation_seconds", "MongoDB operation latency", ("operation",))
+RENDITION_SECONDS = Histogram("image_rendition_seconds", "Time to make an image rendition in the process pool", ("size", "format"))
+EXECUTION_LOG_WAIT_SECONDS = Histogram("execution_log_wait_seconds", "Time executions waited for room in the write-behind queue")
+RESPONSE_RENDER_SECONDS = Histogram("response_render_seconds", "Time to encode document responses")
+RESPONSE_BYTES = Histogram("response_bytes", "Size of encoded document responses", (), SIZE_BUCKETS)
+COMPRESSED_RESPONSES = Counter("compressed_responses_total", "Responses sent compressed, by encoding and source", ("encoding", "source"))
+COMPRESSION_SAVED_BYTES = Counter("compression_saved_bytes_total", "Response bytes saved by compression, by encoding and source", ("encoding", "source"))
+
+# JSON encoding
+def encode_bson_value(value):
+    """orjson fallback for BSON types it does not know natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(content):
+    """Render content to UTF-8 JSON bytes in one pass of native code"""
+    # Stored dates are UTC; write them as ...Z like the rest of the API
+    return orjson.dumps(content, default=encode_bson_value, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+
+class MongoJSONResponse(JSONResponse):
+    """JSON response for MongoDB documents, rendered by orjson
+
+    Queries project ``_id`` away, so documents go to the encoder as fetched,
+    with no copying, recursion or jsonable_encoder pass; any other ObjectId
+    is written as a string.
+    """
+
+    def render(self, content):
+        start = time.perf_counter()
+        body = encode_json(content)
+        RESPONSE_RENDER_SECONDS.observe(time.perf_counter() - start)
+        RESPONSE_BYTES.observe(len(body))
+        return body
+
+# Compression
+# Responses are gzip- or brotli-compressed when the client accepts it and
+# the body is big enough to gain. Static-ish payloads are compressed ahead
+# of time: the tool catalogue once per version, and demo execution bodies
+# up to the execution id (see ResponseTemplate).
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Event streams are left alone so tokens are not held back by the compressor
+COMPRESSIBLE_TYPES = ("application/json", "text/", "image/svg+xml", "application/javascript", "application/xml")
+RESPONSE_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+@functools.lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding, available=RESPONSE_ENCODINGS):
+    """The preferred encoding in ``available`` for an Accept-Encoding header"""
+    if not COMPRESSION_ENABLED or not accept_encoding:
         return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == "_id":
-                continue  # Skip MongoDB _id field
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = serialize_doc(value)
-            else:
-                result[key] = value
-        return result
-    return doc
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+    default = weights.get("*", 0.0)
+    # max() keeps the first of equal weights, i.e. the order of ``available``
+    best = max(available, key=lambda encoding: weights.get(encoding, default))
+    return best if weights.get(best, default) > 0 else None
+
+class StreamCompressor:
+    """gzip or brotli compression of a body delivered in pieces"""
+
+    def __init__(self, encoding, level=None):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+        else:
+            self.compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+def compress(data, encoding, level=None):
+    compressor = StreamCompressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+def precompress(body):
+    """Every encoding of a static body worth sending, at maximum compression"""
+    if not COMPRESSION_ENABLED or len(body) < COMPRESSION_MIN_BYTES:
+        return {}
+    variants = {encoding: compress(body, encoding, 11 if encoding == "br" else 9) for encoding in RESPONSE_ENCODINGS}
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+def record_compression(encoding, source, raw_bytes, sent_bytes):
+    COMPRESSED_RESPONSES.inc(encoding, source)
+    COMPRESSION_SAVED_BYTES.inc(encoding, source, amount=raw_bytes - sent_bytes)
+
+class CompressingSend:
+    """Wraps an ASGI ``send`` to compress one response body on the way out"""
+
+    def __init__(self, send, encoding):
+        self.send = send
+        self.encoding = encoding
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+        self.raw_bytes = self.sent_bytes = 0
+
+    def compressible(self, start, headers, body, more_body):
+        if start["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith("text/event-stream"):
+            return False
+        return more_body or len(body) >= COMPRESSION_MIN_BYTES
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            if not self.compressible(start, headers, body, more_body):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.compressor = StreamCompressor(self.encoding)
+            if not more_body:
+                data = compress(body, self.encoding)
+                if len(data) >= len(body):
+                    self.passthrough = True
+                    await self.send(start)
+                    await self.send(message)
+                    return
+                headers["Content-Length"] = str(len(data))
+                self.prepare(headers)
+                record_compression(self.encoding, "dynamic", len(body), len(data))
+                await self.send({**start, "headers": headers.raw})
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            del headers["Content-Length"]
+            self.prepare(headers)
+            await self.send({**start, "headers": headers.raw})
+
+        self.raw_bytes += len(body)
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        self.sent_bytes += len(data)
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            record_compression(self.encoding, "dynamic", self.raw_bytes, self.sent_bytes)
+
+    def prepare(self, headers):
+        headers["Content-Encoding"] = self.encoding
+        if "accept-encoding" not in headers.get("vary", "").lower():
+            headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ, so a strong validator no longer applies
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli compression for eligible responses"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"accept-encoding":
+                    encoding = negotiate_encoding(value.decode("latin-1"))
+                    if encoding:
+                        send = CompressingSend(send, encoding)
+                    break
+        await self.app(scope, receive, send)
+
+class ResponseTemplate:
+    """A JSON body that only varies in one string value
+
+    Everything before that value is fed to a gzip compressor once; each
+    render copies the compressor's state and compresses just the rest.
+    """
+
+    SLOT = "\u0000slot\u0000"
+
+    def __init__(self, body):
+        self.prefix, self.suffix = body.split(encode_json(self.SLOT))
+        self.gzip = zlib.compressobj(9, zlib.DEFLATED, 31)
+        self.gzip_head = self.gzip.compress(self.prefix)
+
+    def render(self, value, encoding):
+        """Body bytes with ``value`` (already JSON-encoded) in the slot"""
+        if encoding == "gzip":
+            compressor = self.gzip.copy()
+            return self.gzip_head + compressor.compress(value + self.suffix) + compressor.flush()
+        return self.prefix + value + self.suffix
+
+RESPONSE_TEMPLATE_CACHE_SIZE = 256
+response_templates = OrderedDict()
+
+def template_response(request, content, slot):
+    """JSON response for content that repeats apart from ``content[slot]``"""
+    body = encode_json({**content, slot: ResponseTemplate.SLOT})
+    template = response_templates.get(body)
+    if template is None:
+        template = response_templates[body] = ResponseTemplate(body)
+        if len(response_templates) > RESPONSE_TEMPLATE_CACHE_SIZE:
+            response_templates.popitem(last=False)
+    else:
+        response_templates.move_to_end(body)
+
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        # Only gzip state can be copied; brotli clients that also take gzip get gzip
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), ("gzip",))
+    value = encode_json(content[slot])
+    data = template.render(value, encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        record_compression(encoding, "template", len(template.prefix) + len(value) + len(template.suffix), len(data))
+    return Response(content=data, media_type="application/json", headers=headers)
 
 app = FastAPI(title="AI Filmmaking Platform")
 
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -50,15 +409,1142 @@ app.add_middleware(
 )
 
 # MongoDB connection
-client = AsyncIOMotorClient(os.getenv("MONGO_URL"))
+# tz_aware: dates come back as UTC datetimes, comparable with utcnow()
+client = AsyncIOMotorClient(os.getenv("MONGO_URL"), tz_aware=True)
 db = client[os.getenv("DATABASE_NAME")]
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
+# Indexes
+# Expire demo executions this many seconds after creation (0 keeps them)
+DEMO_EXECUTION_TTL = int(os.getenv("DEMO_EXECUTION_TTL", "0"))
+
+# collection -> list of (keys, options); every lookup in this module filters
+# on one of these, so none of them should fall back to a collection scan
+INDEXES = {
+    "projects": [
+        ([("id", 1)], {"name": "id_unique", "unique": True}),
+    ],
+    "executions": [
+        ([("id", 1)], {"name": "id_unique", "unique": True}),
+        # Newest-first time-range pages, per project and across projects
+        ([("project_id", 1), ("created_at", -1), ("_id", -1)], {"name": "project_created"}),
+        ([("created_at", -1), ("_id", -1)], {"name": "created"}),
+        # Retention sweeps select by tool, demo flag and age
+        ([("tool_name", 1), ("is_demo", 1), ("created_at", 1)], {"name": "retention"}),
+        # Keyset pages of a project's executions sort on _id
+        ([("project_id", 1), ("_id", 1)], {"name": "project_page"}),
+    ],
+    "jobs": [
+        ([("id", 1)], {"name": "id_unique", "unique": True}),
+        ([("status", 1)], {"name": "status"}),
+    ],
+    "pipelines": [
+        ([("id", 1)], {"name": "id_unique", "unique": True}),
+        ([("status", 1)], {"name": "status"}),
+    ],
+    "media": [
+        ([("hash", 1)], {"name": "hash_unique", "unique": True}),
+    ],
+    "result_cache": [
+        ([("key", 1)], {"name": "key_unique", "unique": True}),
+        # Mongo drops entries once expires_at has passed
+        ([("expires_at", 1)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "inflight": [
+        ([("key", 1)], {"name": "key_unique", "unique": True}),
+        # Markers left by a crashed worker go once its lease lapses
+        ([("lease_until", 1)], {"name": "lease_until_ttl", "expireAfterSeconds": 0}),
+    ],
+    "leases": [
+        ([("name", 1)], {"name": "name_unique", "unique": True}),
+    ],
+}
+if DEMO_EXECUTION_TTL:
+    INDEXES["executions"].append((
+        [("expires_at", 1)],
+        {"name": "demo_expires_at_ttl", "expireAfterSeconds": 0, "partialFilterExpression": {"is_demo": True}}
+    ))
+
+async def ensure_indexes():
+    """Create missing indexes, rebuilding any whose definition has changed"""
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        for keys, options in specs:
+            try:
+                await collection.create_index(keys, **options)
+            except OperationFailure as e:
+                # 85/86: an index with this name or key exists with other options
+                if e.code not in (85, 86):
+                    logger.error("Could not create index %s.%s: %s", collection_name, options["name"], e)
+                    continue
+                logger.warning("Rebuilding index %s.%s with new options", collection_name, options["name"])
+                await collection.drop_index(options["name"])
+                await collection.create_index(keys, **options)
+        if collection_name == "executions" and not DEMO_EXECUTION_TTL:
+            # Demo TTL was switched off: stop expiring demo executions
+            existing = await collection.index_information()
+            if "demo_expires_at_ttl" in existing:
+                await collection.drop_index("demo_expires_at_ttl")
+
+@app.on_event("startup")
+async def migrate_indexes():
+    await ensure_indexes()
+
+async def report_index_usage():
+    """Print per-index access counts from $indexStats for every collection"""
+    for collection_name in INDEXES:
+        print(f"\n{collection_name}")
+        stats = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(None)
+        for stat in sorted(stats, key=lambda item: item["name"]):
+            accesses = stat.get("accesses", {})
+            ops = accesses.get("ops", 0)
+            since = accesses.get("since")
+            since_text = f"  since {since:%Y-%m-%d %H:%M}" if since else ""
+            unused_text = "  (unused)" if ops == 0 else ""
+            print(f"  {stat['name']:<24} {ops:>12} ops{since_text}{unused_text}")
+
+async def migrate_timestamps():
+    """Replace placeholder string timestamps with real dates
+
+    Records written before timestamps were tracked all claim
+    2025-01-01T00:00:00Z; their ObjectId holds the actual insert time.
+    """
+    for collection_name in ("projects", "executions", "jobs", "pipelines"):
+        collection = db[collection_name]
+        created = await collection.update_many(
+            {"created_at": {"$type": "string"}},
+            [{"$set": {"created_at": {"$toDate": "$_id"}}}]
+        )
+        updated = await collection.update_many(
+            {"updated_at": {"$type": "string"}},
+            [{"$set": {"updated_at": "$created_at"}}]
+        )
+        print(f"{collection_name:<12} created_at fixed on {created.modified_count}, updated_at on {updated.modified_count}")
+
+# Workers
+# The API may run as several processes (python server.py serve --workers N,
+# or any process manager that sets WEB_CONCURRENCY) sharing one database.
+# Jobs, pipelines and in-flight model calls are leased to the worker running
+# them and renewed by its heartbeat; once a worker stops renewing, the others
+# pick its work up.
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Seconds a lease outlives the last heartbeat of the worker holding it
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "30"))
+worker_heartbeat_task = None
+
+def lease_expiry():
+    return utcnow() + timedelta(seconds=WORKER_LEASE_SECONDS)
+
+def worker_share(limit):
+    """This worker's part of a limit that applies to the whole deployment"""
+    return max(1, limit // WORKERS)
+
+async def claim(collection, doc_id):
+    """Lease a job or pipeline document to this worker
+
+    Returns the document, or None when another live worker holds it.
+    """
+    return await collection.find_one_and_update(
+        {"id": doc_id, "$or": [
+            {"owner": WORKER_ID},
+            {"lease_until": None},
+            {"lease_until": {"$lt": utcnow()}}
+        ]},
+        {"$set": {"owner": WORKER_ID, "lease_until": lease_expiry()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def orphans(collection, statuses):
+    """Ids of unfinished documents whose lease has lapsed or was released"""
+    docs = await collection.find(
+        {"status": {"$in": statuses}, "$or": [{"lease_until": None}, {"lease_until": {"$lt": utcnow()}}]},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    return [doc["id"] for doc in docs]
+
+async def release_leases(collection):
+    """Hand this worker's unfinished documents back on shutdown"""
+    await collection.update_many({"owner": WORKER_ID}, {"$set": {"lease_until": None}})
+
+async def acquire_lease(name, seconds):
+    """Hold a named deployment-wide lease; False if another worker has it"""
+    now = utcnow()
+    try:
+        await db.leases.update_one(
+            {"name": name, "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def worker_heartbeat():
+    """Renew this worker's leases and adopt work other workers left behind"""
+    while True:
+        await asyncio.sleep(WORKER_LEASE_SECONDS / 3)
+        try:
+            until = lease_expiry()
+            unfinished = {"owner": WORKER_ID, "status": {"$in": ["queued", "running"]}}
+            for collection in (db.jobs, db.pipelines):
+                await collection.update_many(unfinished, {"$set": {"lease_until": until}})
+            # Failure markers keep their own short expiry
+            await db.inflight.update_many({"owner": WORKER_ID, "error": None}, {"$set": {"lease_until": until}})
+            await recover_jobs()
+            await recover_pipelines()
+        except Exception as e:
+            logger.error("Worker heartbeat failed: %s", e)
+
+@app.on_event("startup")
+async def start_worker_heartbeat():
+    global worker_heartbeat_task
+    worker_heartbeat_task = asyncio.create_task(worker_heartbeat())
+
+@app.on_event("startup")
+async def check_worker_safety():
+    """Warn about what stays per-process when several workers serve the API"""
+    if WORKERS == 1:
+        return
+    logger.warning("Running as one of %d workers (%s)", WORKERS, WORKER_ID)
+    logger.warning("/metrics and /api/stats report this worker only; scrape or query each worker")
+    logger.warning("Scheduler limits are split between workers: each allows 1/%d of the SCHEDULER_* "
+                   "concurrency and queue per model", WORKERS)
+    logger.warning("JOB_WORKERS=%d job tasks run in each worker (%d in total)", JOB_WORKERS, JOB_WORKERS * WORKERS)
+    if REPLICATE_WEBHOOK_URL:
+        logger.warning("Webhooks only wake the worker that receives them; jobs on other workers notice "
+                       "completion within REPLICATE_WEBHOOK_POLL_INTERVAL=%.0fs", REPLICATE_WEBHOOK_POLL_INTERVAL)
+
+@app.on_event("shutdown")
+async def stop_worker_heartbeat():
+    if worker_heartbeat_task:
+        worker_heartbeat_task.cancel()
+
 # Replicate client
 replicate_api_token = os.getenv("REPLICATE_API_TOKEN")
-if replicate_api_token:
-    replicate_client = replicate.Client(api_token=replicate_api_token)
-else:
-    replicate_client = None
+# Built on startup around the shared connection pool below
+replicate_client = None
+
+# Replicate HTTP connection pool
+REPLICATE_HTTP_MAX_CONNECTIONS = int(os.getenv("REPLICATE_HTTP_MAX_CONNECTIONS", "100"))
+REPLICATE_HTTP_MAX_KEEPALIVE = int(os.getenv("REPLICATE_HTTP_MAX_KEEPALIVE", "20"))
+REPLICATE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("REPLICATE_HTTP_KEEPALIVE_EXPIRY", "60"))
+REPLICATE_HTTP_CONNECT_TIMEOUT = float(os.getenv("REPLICATE_HTTP_CONNECT_TIMEOUT", "5"))
+REPLICATE_HTTP_READ_TIMEOUT = float(os.getenv("REPLICATE_HTTP_READ_TIMEOUT", "30"))
+# Seconds a request may wait for a free connection when the pool is full
+REPLICATE_HTTP_POOL_TIMEOUT = float(os.getenv("REPLICATE_HTTP_POOL_TIMEOUT", "10"))
+REPLICATE_HTTP2 = os.getenv("REPLICATE_HTTP2", "true").lower() == "true"
+
+def http2_available():
+    """True when the h2 package httpx needs for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class PooledTransport(httpx.AsyncHTTPTransport):
+    """Keep-alive connection pool shared by all Replicate traffic
+
+    Counts requests, TCP connects and TLS handshakes so the pool can be sized
+    from /api/stats: handshakes growing with requests means connections are
+    not being reused.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.connects = 0
+        self.tls_handshakes = 0
+
+    async def trace(self, event, info):
+        if event == "connection.connect_tcp.complete":
+            self.connects += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+        return await super().handle_async_request(request)
+
+    def stats(self):
+        connections = self._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "queued": sum(1 for request in self._pool._requests if request.is_queued()),
+            "max_connections": REPLICATE_HTTP_MAX_CONNECTIONS,
+            "requests": self.requests,
+            "connects": self.connects,
+            "tls_handshakes": self.tls_handshakes
+        }
+
+replicate_transport = None
+# Plain client on the same pool for prediction stream URLs
+replicate_http = None
+
+@app.on_event("startup")
+async def open_replicate_http():
+    global replicate_transport, replicate_http, replicate_client
+    replicate_transport = PooledTransport(
+        limits=httpx.Limits(
+            max_connections=REPLICATE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=REPLICATE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=REPLICATE_HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=REPLICATE_HTTP2 and http2_available()
+    )
+    timeout = httpx.Timeout(
+        REPLICATE_HTTP_READ_TIMEOUT,
+        connect=REPLICATE_HTTP_CONNECT_TIMEOUT,
+        pool=REPLICATE_HTTP_POOL_TIMEOUT
+    )
+    replicate_http = httpx.AsyncClient(transport=replicate_transport, timeout=timeout)
+    if replicate_api_token:
+        replicate_client = replicate.Client(
+            api_token=replicate_api_token,
+            timeout=timeout,
+            transport=replicate_transport
+        )
+
+@app.on_event("shutdown")
+async def close_replicate_http():
+    # Both clients share the transport, so closing it closes every connection
+    if replicate_transport:
+        await replicate_transport.aclose()
+
+# Replicate execution settings
+REPLICATE_POLL_INTERVAL = float(os.getenv("REPLICATE_POLL_INTERVAL", "0.5"))
+REPLICATE_TIMEOUT = float(os.getenv("REPLICATE_TIMEOUT", "900"))
+# Concurrency for models outside the known classes below
+REPLICATE_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("REPLICATE_MAX_CONCURRENCY_PER_MODEL", "64"))
+
+# Public base URL of this API; when set, async jobs ask Replicate to POST
+# completed predictions to /api/webhooks/replicate instead of polling
+REPLICATE_WEBHOOK_URL = os.getenv("REPLICATE_WEBHOOK_URL", "").rstrip("/")
+REPLICATE_WEBHOOK_POLL_INTERVAL = float(os.getenv("REPLICATE_WEBHOOK_POLL_INTERVAL", "30"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+
+# Scheduler
+# Every replicate_model gets its own concurrency pool, sized by the model's
+# class, so a burst of slow video jobs cannot take the slots quick LLM calls
+# need. Within a pool, waiting calls are admitted round-robin by project.
+MODEL_CLASSES = {
+    "meta/llama-2-7b-chat": "llm",
+    "stability-ai/sdxl": "image",
+    "devxpy/codeformer": "image",
+    "suno-ai/bark": "audio",
+    "stability-ai/stable-video-diffusion": "video",
+}
+MODEL_CLASS_CONCURRENCY = {
+    "llm": int(os.getenv("SCHEDULER_CONCURRENCY_LLM", "32")),
+    "image": int(os.getenv("SCHEDULER_CONCURRENCY_IMAGE", "16")),
+    "audio": int(os.getenv("SCHEDULER_CONCURRENCY_AUDIO", "8")),
+    "video": int(os.getenv("SCHEDULER_CONCURRENCY_VIDEO", "4")),
+}
+# Calls allowed to wait per model before new ones are turned away with a 429
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+
+def model_class(model_ref):
+    """Scheduling class of a Replicate model reference"""
+    return MODEL_CLASSES.get(model_ref.split(":", 1)[0], "default")
+
+class SchedulerBusy(Exception):
+    """Raised when a model's wait queue is full"""
+
+    def __init__(self, model_ref, retry_after):
+        super().__init__(f"Too many queued requests for {model_ref}; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class FairLimiter:
+    """Concurrency limit for one model, shared fairly across projects
+
+    Each project waits in its own FIFO lane; a freed slot goes to the next
+    lane in rotation, so one project's backlog only delays its own calls.
+    """
+
+    def __init__(self, model_ref, limit, max_queue):
+        self.model_ref = model_ref
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.queued = 0
+        # project id -> deque of waiting futures, in rotation order
+        self.lanes = OrderedDict()
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # Moving average of how long a call holds its slot
+        self.avg_hold = 0.0
+
+    def retry_after(self):
+        """Rough seconds until the current queue has drained"""
+        backlog = self.queued / self.limit + 1
+        return max(1, round(backlog * (self.avg_hold or REPLICATE_POLL_INTERVAL)))
+
+    def is_full(self):
+        return self.active >= self.limit and self.queued >= self.max_queue
+
+    async def acquire(self, project_id, bounded=True):
+        start = time.monotonic()
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+        else:
+            if bounded and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerBusy(self.model_ref, self.retry_after())
+            future = asyncio.get_running_loop().create_future()
+            lane = self.lanes.setdefault(project_id, deque())
+            lane.append(future)
+            self.queued += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self.release()
+                elif future in lane:
+                    # release() may already have popped (and uncounted) it
+                    lane.remove(future)
+                    self.queued -= 1
+                    if not lane and self.lanes.get(project_id) is lane:
+                        del self.lanes[project_id]
+                raise
+        wait = time.monotonic() - start
+        SCHEDULER_WAIT_SECONDS.observe(wait, self.model_ref)
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def release(self):
+        """Hand the slot to the next waiting project, or free it"""
+        while self.lanes:
+            project_id, lane = next(iter(self.lanes.items()))
+            future = lane.popleft()
+            self.queued -= 1
+            if lane:
+                self.lanes.move_to_end(project_id)
+            else:
+                del self.lanes[project_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, project_id=None, bounded=True):
+        await self.acquire(project_id, bounded)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - start
+            self.avg_hold = held if not self.avg_hold else 0.8 * self.avg_hold + 0.2 * held
+            self.release()
+
+    def stats(self):
+        return {
+            "class": model_class(self.model_ref),
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "projects_waiting": len(self.lanes),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1)
+        }
+
+model_limiters = {}
+
+def get_model_limiter(model_ref):
+    """Return the fair concurrency limiter for a Replicate model reference"""
+    limiter = model_limiters.get(model_ref)
+    if limiter is None:
+        limit = MODEL_CLASS_CONCURRENCY.get(model_class(model_ref), REPLICATE_MAX_CONCURRENCY_PER_MODEL)
+        limiter = FairLimiter(model_ref, worker_share(limit), worker_share(SCHEDULER_MAX_QUEUE))
+        model_limiters[model_ref] = limiter
+    return limiter
+
+def busy_exception(e):
+    """The 429 response for a full model queue"""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def model_version(model_ref):
+    """Extract the version id from an owner/name:version reference"""
+    return model_ref.split(":", 1)[1] if ":" in model_ref else model_ref
+
+def normalize_output(output):
+    """Flatten Replicate output the same way for every tool"""
+    if hasattr(output, '__iter__') and not isinstance(output, (str, bytes, dict)):
+        # Token lists and file lists are joined into a single string
+        return ''.join(str(item) for item in output)
+    if not isinstance(output, (str, dict, list, int, float, bool)) and output is not None:
+        return str(output)
+    return output
+
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+async def wait_for_prediction(prediction, wake=None):
+    """Poll a prediction until it reaches a terminal state
+
+    When a ``wake`` event is supplied (set by the webhook receiver) polling
+    falls back to a slow safety interval and returns as soon as it fires.
+    """
+    deadline = time.monotonic() + REPLICATE_TIMEOUT
+    while prediction.status not in TERMINAL_STATUSES:
+        if time.monotonic() > deadline:
+            # Don't keep paying for a prediction nobody is waiting on
+            try:
+                await replicate_client.predictions.async_cancel(prediction.id)
+            except Exception:
+                pass
+            raise TimeoutError(f"Prediction {prediction.id} timed out after {REPLICATE_TIMEOUT:.0f}s")
+        if wake is not None:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=REPLICATE_WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(REPLICATE_POLL_INTERVAL)
+        prediction = await replicate_client.predictions.async_get(prediction.id)
+    return prediction
+
+def prediction_result(prediction):
+    """Return the normalized output of a finished prediction or raise"""
+    if prediction.status != "succeeded":
+        raise ModelError(prediction.error or f"Prediction {prediction.status}")
+    return normalize_output(prediction.output)
+
+async def run_replicate_model(model_ref, inputs, project_id=None):
+    """Run a Replicate prediction without blocking the event loop
+
+    Creates the prediction and polls it with the SDK's async HTTP client, so a
+    long SDXL or video generation only holds a scheduler slot, not a thread.
+    """
+    async with get_model_limiter(model_ref).slot(project_id), PREDICTION_SECONDS.time(model_ref):
+        prediction = await replicate_client.predictions.async_create(
+            version=model_version(model_ref),
+            input=await model_inputs(inputs)
+        )
+        try:
+            prediction = await wait_for_prediction(prediction)
+        except asyncio.CancelledError:
+            try:
+                await replicate_client.predictions.async_cancel(prediction.id)
+            except Exception:
+                pass
+            raise
+        return prediction_result(prediction)
+
+# Result cache
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+
+class ResultCache:
+    """Two-tier cache of model results keyed by a hash of model and inputs
+
+    Lookups hit a bounded in-process LRU first and fall back to the
+    result_cache collection, whose TTL index expires entries in Mongo.
+    """
+
+    def __init__(self, collection, max_entries):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def remember(self, key, result, expires_at):
+        self.entries[key] = (result, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get(self, key):
+        """Return (found, result) for a cache key"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self.entries.move_to_end(key)
+                return True, entry[0]
+            del self.entries[key]
+
+        doc = await self.collection.find_one(
+            {"key": key, "expires_at": {"$gt": utcnow()}},
+            {"_id": 0, "result": 1, "expires_at": 1}
+        )
+        if doc is None:
+            return False, None
+        expires_at = doc["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        self.remember(key, doc["result"], expires_at)
+        return True, doc["result"]
+
+    async def set(self, key, model_ref, result, ttl):
+        expires_at = utcnow() + timedelta(seconds=ttl)
+        self.remember(key, result, expires_at.timestamp())
+        await self.collection.update_one(
+            {"key": key},
+            {"$set": {"key": key, "model": model_ref, "result": result, "expires_at": expires_at}},
+            upsert=True
+        )
+
+result_cache = ResultCache(db.result_cache, RESULT_CACHE_SIZE)
+
+def cache_key(model_ref, inputs):
+    """Canonical content hash of a model invocation"""
+    canonical = json.dumps([model_ref, inputs], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def is_reusable(tool, inputs):
+    """True when identical inputs may share one result for this tool"""
+    mode = (tool.cache or {}).get("mode", "never")
+    if mode == "seeded":
+        # Unseeded image/video/audio generations are meant to differ per run
+        return inputs.get("seed") is not None
+    return mode == "always"
+
+def cache_ttl(tool, inputs):
+    """Seconds to cache a tool's result for these inputs, 0 to skip caching"""
+    if not RESULT_CACHE_ENABLED or not is_reusable(tool, inputs):
+        return 0
+    return (tool.cache or {}).get("ttl", 3600)
+
+# Single-flight
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared task
+
+    The shared work runs in its own task, so a caller that is cancelled
+    (e.g. its client disconnected) only stops waiting; the work itself is
+    cancelled once no callers are left.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def forget(self, key, call):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    async def do(self, key, fn):
+        """Return ``(result, shared)``; ``shared`` is True for coalesced callers"""
+        call = self.calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            call = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+            self.calls[key] = call
+            call["task"].add_done_callback(lambda _: self.forget(key, call))
+            self.leaders += 1
+
+        call["waiters"] += 1
+        try:
+            return await asyncio.shield(call["task"]), shared
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                call["task"].cancel()
+                # The task may take a while to unwind (e.g. cancelling the
+                # prediction); a new caller must start fresh, not join it
+                self.forget(key, call)
+
+singleflight = SingleFlight()
+
+# Seconds between result cache checks while another worker computes a key
+INFLIGHT_POLL_INTERVAL = float(os.getenv("INFLIGHT_POLL_INTERVAL", "0.5"))
+
+# Seconds a failed computation is reported to workers waiting on the same
+# key, instead of each of them retrying the failing (and billed) call in turn
+INFLIGHT_ERROR_SECONDS = float(os.getenv("INFLIGHT_ERROR_SECONDS", "10"))
+
+class SharedFailure(Exception):
+    """Another worker's computation of the same result failed"""
+
+async def across_workers(key, compute):
+    """Return ``(result, shared)``, computing only if no other worker is
+
+    The worker that inserts ``key`` into db.inflight computes (and caches)
+    the result; the others poll the result cache for it, and take over if
+    the marker is removed or its lease lapses before a result appears. A
+    failure is left on the marker for INFLIGHT_ERROR_SECONDS and raised to
+    everyone waiting on or asking for the key in that time.
+    """
+    while True:
+        try:
+            await db.inflight.insert_one({"key": key, "owner": WORKER_ID, "lease_until": lease_expiry()})
+        except DuplicateKeyError:
+            found, result = await result_cache.get(key)
+            if found:
+                return result, True
+            marker = await db.inflight.find_one({"key": key}, {"_id": 0, "error": 1, "lease_until": 1})
+            if marker and marker.get("error") and marker["lease_until"] > utcnow():
+                raise SharedFailure(marker["error"])
+            await db.inflight.delete_one({"key": key, "lease_until": {"$lt": utcnow()}})
+            await asyncio.sleep(INFLIGHT_POLL_INTERVAL)
+            continue
+        try:
+            result = await compute()
+        except SchedulerBusy:
+            # Backpressure is this worker's own; others may have room
+            await db.inflight.delete_one({"key": key, "owner": WORKER_ID})
+            raise
+        except Exception as e:
+            await db.inflight.update_one({"key": key, "owner": WORKER_ID}, {"$set": {
+                "error": str(e) or type(e).__name__,
+                "lease_until": utcnow() + timedelta(seconds=INFLIGHT_ERROR_SECONDS)
+            }})
+            raise
+        except BaseException:
+            await db.inflight.delete_one({"key": key, "owner": WORKER_ID})
+            raise
+        await db.inflight.delete_one({"key": key, "owner": WORKER_ID})
+        return result, False
+
+async def run_tool_cached(tool, inputs, run=None, project_id=None):
+    """Run a tool's model, serving repeated invocations from the result cache
+
+    Concurrent identical invocations share one in-flight prediction. ``run``
+    overrides how a miss is computed (defaults to a direct prediction).
+    Returns ``(result, cache_status)`` where the status is "hit", "miss",
+    "coalesced" or "off".
+    """
+    run = run or (lambda: run_replicate_model(tool.replicate_model, inputs, project_id))
+    if not is_reusable(tool, inputs):
+        return await run(), "off"
+
+    key = cache_key(tool.replicate_model, inputs)
+    ttl = cache_ttl(tool, inputs)
+    if ttl:
+        found, result = await result_cache.get(key)
+        if found:
+            return result, "hit"
+
+    async def compute():
+        # Cache the blob reference, not the inline payload
+        result, _ = await offload_media(await run())
+        if ttl:
+            await result_cache.set(key, tool.replicate_model, result, ttl)
+        return result
+
+    async def compute_once():
+        # Other workers can only share a result that lands in the cache, and
+        # a single worker needs no marker beyond the in-process single-flight
+        if not ttl or WORKERS == 1:
+            return await compute(), False
+        return await across_workers(key, compute)
+
+    (result, elsewhere), shared = await singleflight.do(key, compute_once)
+    if shared or elsewhere:
+        return result, "coalesced"
+    return result, "miss" if ttl else "off"
+
+# Media storage
+# Inline base64 payloads are moved out of Mongo into a content-addressed blob
+# store; documents keep a /api/media/{hash} reference instead.
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE") or "local"
+MEDIA_ROOT = os.getenv("MEDIA_ROOT") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "media")
+# Prefix for media URLs handed to clients; empty keeps them relative to the API
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "").rstrip("/")
+MEDIA_CHUNK_SIZE = 256 * 1024
+# Largest file POST /api/media accepts
+MEDIA_UPLOAD_MAX_BYTES = int(os.getenv("MEDIA_UPLOAD_MAX_BYTES", str(1024 ** 3)))
+# Largest media input sent to Replicate inline as a data URI; bigger inputs
+# need a public MEDIA_BASE_URL that Replicate can fetch them from
+MEDIA_INLINE_MAX_BYTES = int(os.getenv("MEDIA_INLINE_MAX_BYTES", str(25 * 1024 ** 2)))
+UPLOAD_MEDIA_TYPES = ("image/", "audio/", "video/")
+DATA_URI_PATTERN = re.compile(r"^data:([\w.+-]+/[\w.+-]+)(?:;[\w-]+=[^;,]*)*;base64,", re.I)
+MEDIA_URL_PATTERN = re.compile(r"/api/media/([0-9a-f]{64})$")
+
+class LocalBlobStore:
+    """Content-addressed blobs on the local filesystem
+
+    Blobs live at ``<root>/<hash[:2]>/<hash>``. Other backends (e.g. an
+    S3-compatible store) only need to provide the same methods.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def write(self, digest, data):
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial blob
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def begin_write(self):
+        """Open a temporary file for a blob whose hash is not known yet"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f"upload.{uuid.uuid4().hex}.tmp")
+        return tmp_path, open(tmp_path, "wb")
+
+    def finish_write(self, tmp_path, digest):
+        """Move a streamed write into place; False if the blob already existed"""
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return True
+
+    def read(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def iter_range(self, digest, start, length):
+        with open(self.path(digest), "rb") as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(MEDIA_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+BLOB_STORES = {"local": LocalBlobStore}
+blob_store = BLOB_STORES[MEDIA_STORAGE](MEDIA_ROOT)
+
+def media_url(digest):
+    return f"{MEDIA_BASE_URL}/api/media/{digest}"
+
+async def record_media(digest, content_type, size):
+    """Register a stored blob and return its metadata"""
+    media = {"hash": digest, "content_type": content_type, "size": size}
+    await db.media.update_one(
+        {"hash": digest},
+        {"$setOnInsert": {**media, "created_at": utcnow()}},
+        upsert=True
+    )
+    return media
+
+async def store_media(data, content_type):
+    """Store bytes once by content hash and return their metadata"""
+    digest = hashlib.sha256(data).hexdigest()
+    if not await asyncio.to_thread(blob_store.exists, digest):
+        await asyncio.to_thread(blob_store.write, digest, data)
+    return await record_media(digest, content_type, len(data))
+
+class BlobUpload:
+    """Hash and write an upload chunk by chunk, so it is never held whole"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.tmp_path, self.file = blob_store.begin_write()
+
+    def write(self, chunks):
+        for chunk in chunks:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {self.max_bytes} bytes")
+            self.hash.update(chunk)
+            self.file.write(chunk)
+
+    def finish(self):
+        """Store the blob; returns ``(digest, created)``"""
+        self.file.close()
+        digest = self.hash.hexdigest()
+        return digest, blob_store.finish_write(self.tmp_path, digest)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class UploadParser:
+    """Multipart callbacks that pass the first file part's bytes through
+
+    Other form fields are skipped. ``pending`` collects the file data of the
+    chunk just parsed, for the caller to write out.
+    """
+
+    def __init__(self, boundary):
+        self.content_type = None
+        self.pending = []
+        self.in_file = False
+        self.headers = {}
+        self.field = self.value = b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data
+        })
+
+    def on_part_begin(self):
+        self.headers = {}
+        self.in_file = False
+
+    def on_header_field(self, data, start, end):
+        self.field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.field.lower()] = self.value
+        self.field = self.value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if self.content_type is None and b"filename" in options:
+            self.in_file = True
+            content_type, _ = parse_options_header(self.headers.get(b"content-type", b"application/octet-stream"))
+            self.content_type = content_type.decode("latin-1").lower()
+
+    def on_part_data(self, data, start, end):
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+async def receive_upload(request):
+    """Stream a request body into the blob store; returns ``(media, created)``
+
+    Accepts multipart/form-data (the first file part is stored) or a raw
+    body whose Content-Type is the file's.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    content_type = content_type.decode("latin-1").lower()
+    upload = await asyncio.to_thread(BlobUpload, MEDIA_UPLOAD_MAX_BYTES)
+    try:
+        if content_type == "multipart/form-data":
+            if not params.get(b"boundary"):
+                raise HTTPException(status_code=400, detail="Missing multipart boundary")
+            parser = UploadParser(params[b"boundary"])
+            async for chunk in request.stream():
+                parser.parser.write(chunk)
+                if parser.pending:
+                    await asyncio.to_thread(upload.write, parser.pending)
+                    parser.pending = []
+            parser.parser.finalize()
+            content_type = parser.content_type
+            if content_type is None:
+                raise HTTPException(status_code=400, detail="No file in upload")
+        else:
+            async for chunk in request.stream():
+                await asyncio.to_thread(upload.write, [chunk])
+        if not content_type.startswith(UPLOAD_MEDIA_TYPES):
+            raise HTTPException(status_code=415, detail=f"Unsupported media type {content_type or 'unknown'}")
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        digest, created = await asyncio.to_thread(upload.finish)
+    except MultipartParseError as e:
+        await asyncio.to_thread(upload.abort)
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        await asyncio.to_thread(upload.abort)
+        raise
+    return await record_media(digest, content_type, upload.size), created
+
+async def offload_media(result):
+    """Return ``(result, media)`` with inline data URIs replaced by a media URL
+
+    Results that already reference the blob store get their metadata looked
+    up; anything else is returned unchanged with ``media`` set to None.
+    """
+    if not isinstance(result, str):
+        return result, None
+    match = DATA_URI_PATTERN.match(result)
+    if match:
+        data = base64.b64decode(result[match.end():])
+        media = await store_media(data, match.group(1).lower())
+        return media_url(media["hash"]), media
+    match = MEDIA_URL_PATTERN.search(result)
+    if match and result == media_url(match.group(1)):
+        media = await db.media.find_one({"hash": match.group(1)}, {"_id": 0, "created_at": 0})
+        return result, media
+    return result, None
+
+async def inline_media(value):
+    """Turn a relative media URL back into a data URI a model can read
+
+    Media URLs under a public MEDIA_BASE_URL are fetchable as they are; any
+    other value is returned unchanged.
+    """
+    if not isinstance(value, str) or MEDIA_BASE_URL.startswith(("http://", "https://")):
+        return value
+    match = MEDIA_URL_PATTERN.search(value)
+    if not match or value != media_url(match.group(1)):
+        return value
+    media = await db.media.find_one({"hash": match.group(1)}, {"_id": 0, "content_type": 1, "size": 1})
+    if not media:
+        return value
+    if media["size"] > MEDIA_INLINE_MAX_BYTES:
+        raise ValueError(f"Media input of {media['size']} bytes is too large to send inline; "
+                         "set MEDIA_BASE_URL to a public URL Replicate can fetch it from")
+    data = await asyncio.to_thread(blob_store.read, match.group(1))
+    return f"data:{media['content_type']};base64,{base64.b64encode(data).decode()}"
+
+async def model_inputs(inputs):
+    """Inputs as sent to Replicate, with media handles resolved"""
+    return {key: await inline_media(value) for key, value in inputs.items()}
+
+# Image renditions
+# Stored images get downscaled renditions for galleries and dashboards,
+# served by /api/media/{hash}?size=thumb|medium as AVIF (when Pillow has it),
+# WebP or, for clients that take neither, JPEG/PNG. Decoding and encoding run
+# in a process pool so a large image never blocks the event loop. Image tool
+# results and uploads have the WebP renditions made right away; any other
+# rendition is made on first request and kept next to the original.
+IMAGE_RENDITION_SIZES = {
+    "thumb": int(os.getenv("IMAGE_THUMB_SIZE", "256")),
+    "medium": int(os.getenv("IMAGE_MEDIUM_SIZE", "1024"))
+}
+IMAGE_RENDITION_QUALITY = int(os.getenv("IMAGE_RENDITION_QUALITY", "75"))
+IMAGE_RENDITION_WORKERS = int(os.getenv("IMAGE_RENDITION_WORKERS", "2"))
+# Formats Pillow can decode that are worth downscaling (not SVG)
+RENDITION_SOURCE_TYPES = ("image/png", "image/jpeg", "image/webp", "image/gif", "image/bmp", "image/tiff")
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG", "png": "PNG"}
+# Preferred first; AVIF needs a Pillow build with the AVIF plugin
+RENDITION_FORMATS = tuple(
+    image_format for image_format in ("avif", "webp")
+    if PIL_FORMATS[image_format] in Image.registered_extensions().values()
+) if Image else ()
+# Made as soon as an image is stored; the formats every current browser takes
+EAGER_RENDITIONS = (("thumb", "webp"), ("medium", "webp"))
+
+rendition_executor = None
+rendition_tasks = set()
+
+def render_image(data, max_side, image_format, quality):
+    """Downscale an encoded image to fit ``max_side`` and re-encode it
+
+    Runs in the rendition process pool; returns ``(bytes, (width, height))``.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG sources decode straight at a reduced scale
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha and image_format != "jpeg" else "RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, PIL_FORMATS[image_format], quality=quality)
+        return output.getvalue(), image.size
+
+def rendition_pool():
+    global rendition_executor
+    if rendition_executor is None:
+        # Spawned, not forked: the API process runs threads (Motor, to_thread)
+        rendition_executor = ProcessPoolExecutor(
+            max_workers=IMAGE_RENDITION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return rendition_executor
+
+def has_renditions(media):
+    return bool(Image) and media.get("content_type") in RENDITION_SOURCE_TYPES
+
+@functools.lru_cache(maxsize=256)
+def rendition_format(accept, source_type):
+    """Best rendition format for an Accept header, falling back to JPEG/PNG"""
+    for image_format in RENDITION_FORMATS:
+        if f"image/{image_format}" in accept:
+            return image_format
+    return "png" if source_type == "image/png" else "jpeg"
+
+async def make_rendition(media, size, image_format):
+    global rendition_executor
+    data = await asyncio.to_thread(blob_store.read, media["hash"])
+    loop = asyncio.get_running_loop()
+    try:
+        with RENDITION_SECONDS.time(size, image_format):
+            output, (width, height) = await loop.run_in_executor(
+                rendition_pool(), render_image, data,
+                IMAGE_RENDITION_SIZES[size], image_format, IMAGE_RENDITION_QUALITY
+            )
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        rendition_executor = None
+        raise
+    rendition = {**await store_media(output, f"image/{image_format}"), "width": width, "height": height}
+    await db.media.update_one(
+        {"hash": media["hash"]},
+        {"$set": {f"renditions.{size}-{image_format}": rendition}}
+    )
+    return rendition
+
+async def image_rendition(media, size, image_format):
+    """Metadata of a stored rendition of ``media``, made if missing"""
+    rendition = (media.get("renditions") or {}).get(f"{size}-{image_format}")
+    if rendition:
+        return rendition
+    rendition, _ = await singleflight.do(
+        ("rendition", media["hash"], size, image_format),
+        lambda: make_rendition(media, size, image_format)
+    )
+    return rendition
+
+async def warm_renditions(media):
+    for size, image_format in EAGER_RENDITIONS:
+        if image_format not in RENDITION_FORMATS:
+            continue
+        try:
+            await image_rendition(media, size, image_format)
+        except Exception as e:
+            logger.warning("Failed to make %s %s rendition of %s: %s", size, image_format, media["hash"], e)
+            return
+
+def schedule_renditions(media):
+    """Make the eager renditions of a stored image in the background"""
+    if media and has_renditions(media):
+        task = asyncio.create_task(warm_renditions(media))
+        rendition_tasks.add(task)
+        task.add_done_callback(rendition_tasks.discard)
+
+@app.on_event("shutdown")
+async def stop_rendition_pool():
+    for task in list(rendition_tasks):
+        task.cancel()
+    if rendition_executor:
+        rendition_executor.shutdown(wait=False, cancel_futures=True)
+
+async def fetch_media(url):
+    """Copy a model's output file into the blob store; returns its metadata
+
+    Replicate delivery URLs expire after an hour, and renditions need the
+    bytes, so image tool outputs are kept. Returns None if the fetch fails.
+    """
+    try:
+        async with replicate_http.stream("GET", url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/"):
+                return None
+            upload = await asyncio.to_thread(BlobUpload, MEDIA_UPLOAD_MAX_BYTES)
+            try:
+                async for chunk in response.aiter_bytes(MEDIA_CHUNK_SIZE):
+                    await asyncio.to_thread(upload.write, [chunk])
+                digest, _ = await asyncio.to_thread(upload.finish)
+            except BaseException:
+                await asyncio.to_thread(upload.abort)
+                raise
+        return await record_media(digest, content_type, upload.size)
+    except (httpx.HTTPError, HTTPException, OSError) as e:
+        logger.warning("Keeping remote URL for %s: %s", url, e)
+        return None
 
 # Dummy data for demo purposes
 DUMMY_RESPONSES = {
@@ -159,21 +1645,54 @@ class ToolRequest(BaseModel):
     tool_name: str
     inputs: dict
     project_id: Optional[str] = None
+    async_mode: bool = False
+
+class BatchToolRequest(BaseModel):
+    requests: List[ToolRequest]
+    # Stream each result as an SSE event when it completes
+    stream: bool = False
+
+class PipelineStep(BaseModel):
+    id: str
+    tool_name: str
+    # Any value may be {"$ref": "<step id>"} to take that step's result
+    inputs: dict = {}
+    depends_on: List[str] = []
+
+class PipelineRequest(BaseModel):
+    steps: List[PipelineStep]
+    project_id: Optional[str] = None
 
 class ProjectModel(BaseModel):
     name: str
     description: str
     tools_used: List[str] = []
 
+# A read-only dict: tools are shared by every request through the registry,
+# and its pre-rendered payloads and compiled schemas must not drift from them
+FrozenDict = Annotated[
+    Dict[str, Any],
+    AfterValidator(lambda value: MappingProxyType(value)),
+    PlainSerializer(lambda value: dict(value), return_type=dict)
+]
+
 class ToolModel(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str
     category: str
     description: str
     replicate_model: str
-    inputs: dict
+    inputs: FrozenDict
     icon: str
+    cache: Optional[FrozenDict] = None
+    retention: Optional[FrozenDict] = None
 
 # AI Tools Configuration
+# "cache" controls result caching: "always" for text models, "seeded" for
+# image/video/audio models (only cached when the inputs pin a seed). Media
+# TTLs stay under an hour because replicate.delivery URLs expire. An optional
+# "retention" entry overrides the default {"demo_days", "archive_days"}.
 AI_TOOLS = [
     {
         "name": "Brainstorm Ideas",
@@ -181,7 +1700,8 @@ AI_TOOLS = [
         "description": "Generate creative concepts and ideas for your film projects",
         "replicate_model": "meta/llama-2-7b-chat:8e6975e5ed6174911a6ff3d60540dfd4844201974602551e10e9e87ab143d81e",
         "inputs": {"prompt": "text", "genre": "text"},
-        "icon": "💡"
+        "icon": "💡",
+        "cache": {"mode": "always", "ttl": 86400}
     },
     {
         "name": "Script Writer",
@@ -189,122 +1709,442 @@ AI_TOOLS = [
         "description": "AI-powered screenplay and script generation",
         "replicate_model": "meta/llama-2-7b-chat:8e6975e5ed6174911a6ff3d60540dfd4844201974602551e10e9e87ab143d81e",
         "inputs": {"prompt": "text", "system_prompt": "text"},
-        "icon": "📝"
+        "icon": "📝",
+        "cache": {"mode": "always", "ttl": 86400}
     },
     {
         "name": "Character Builder",
         "category": "Pre-Production",
         "description": "Design and create characters for your film",
         "replicate_model": "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-        "inputs": {"prompt": "text", "style": "text"},
-        "icon": "👤"
+        "inputs": {"prompt": "text", "style": "text", "reference_image": "image", "seed": "integer"},
+        "icon": "👤",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Environment Builder", 
         "category": "Pre-Production",
         "description": "Create stunning environments and backgrounds",
         "replicate_model": "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-        "inputs": {"prompt": "text", "aspect_ratio": "text"},
-        "icon": "🌄"
+        "inputs": {"prompt": "text", "aspect_ratio": "text", "seed": "integer"},
+        "icon": "🌄",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Story Board Builder",
         "category": "Pre-Production",
         "description": "Generate visual storyboards from your script",
         "replicate_model": "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-        "inputs": {"prompt": "text", "style": "text"},
-        "icon": "📋"
+        "inputs": {"prompt": "text", "style": "text", "seed": "integer"},
+        "icon": "📋",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Animation",
         "category": "Production",
         "description": "Generate animated sequences",
         "replicate_model": "stability-ai/stable-video-diffusion:3f0457e4619daac51203dedb1a4c069c4c2f5b9bab8c0bb78c1d0b8d6ab77e0c",
-        "inputs": {"image": "image", "motion_bucket_id": "integer"},
-        "icon": "🎬"
+        "inputs": {"image": "image", "motion_bucket_id": "integer", "seed": "integer"},
+        "icon": "🎬",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Voices",
         "category": "Production",
         "description": "AI voice generation and synthesis",
         "replicate_model": "suno-ai/bark:b76242b40d67c76ab6742e987628a2a9ac019e11d56ab96c4e91ce03b79b2787",
-        "inputs": {"prompt": "text", "text_prompt": "text"},
-        "icon": "🎤"
+        "inputs": {"prompt": "text", "text_prompt": "text", "seed": "integer"},
+        "icon": "🎤",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Lip Sync",
         "category": "Production",
         "description": "Synchronize lips with audio",
         "replicate_model": "devxpy/codeformer:7de2ea26c616d5bf2245ad0d5e24f0ff9a6204578a5c876db53142edd9d2cd56",
-        "inputs": {"image": "image", "audio": "audio"},
-        "icon": "💋"
+        "inputs": {"image": "image", "audio": "audio", "seed": "integer"},
+        "icon": "💋",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Music",
         "category": "Production",
         "description": "Generate background music and soundtracks",
         "replicate_model": "suno-ai/bark:b76242b40d67c76ab6742e987628a2a9ac019e11d56ab96c4e91ce03b79b2787",
-        "inputs": {"prompt": "text", "duration": "integer"},
-        "icon": "🎵"
+        "inputs": {"prompt": "text", "duration": "integer", "seed": "integer"},
+        "icon": "🎵",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "SFX",
         "category": "Production",
         "description": "Create sound effects",
         "replicate_model": "suno-ai/bark:b76242b40d67c76ab6742e987628a2a9ac019e11d56ab96c4e91ce03b79b2787",
-        "inputs": {"prompt": "text", "type": "text"},
-        "icon": "🔊"
+        "inputs": {"prompt": "text", "type": "text", "seed": "integer"},
+        "icon": "🔊",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Titles",
         "category": "Post-Production",
         "description": "Generate titles and text overlays",
         "replicate_model": "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-        "inputs": {"text": "text", "style": "text"},
-        "icon": "🔤"
+        "inputs": {"text": "text", "style": "text", "seed": "integer"},
+        "icon": "🔤",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "VFX",
         "category": "Post-Production",
         "description": "Add visual effects to your footage",
         "replicate_model": "stability-ai/stable-video-diffusion:3f0457e4619daac51203dedb1a4c069c4c2f5b9bab8c0bb78c1d0b8d6ab77e0c",
-        "inputs": {"image": "image", "effect_type": "text"},
-        "icon": "✨"
+        "inputs": {"image": "image", "effect_type": "text", "seed": "integer"},
+        "icon": "✨",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Editing",
         "category": "Post-Production",
         "description": "AI-powered video editing and assembly",
         "replicate_model": "stability-ai/stable-video-diffusion:3f0457e4619daac51203dedb1a4c069c4c2f5b9bab8c0bb78c1d0b8d6ab77e0c",
-        "inputs": {"video": "video", "instructions": "text"},
-        "icon": "✂️"
+        "inputs": {"video": "video", "instructions": "text", "seed": "integer"},
+        "icon": "✂️",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Product",
         "category": "Distribution",
         "description": "Finalize your film for distribution",
         "replicate_model": "stability-ai/stable-video-diffusion:3f0457e4619daac51203dedb1a4c069c4c2f5b9bab8c0bb78c1d0b8d6ab77e0c",
-        "inputs": {"video": "video", "format": "text"},
-        "icon": "📦"
+        "inputs": {"video": "video", "format": "text", "seed": "integer"},
+        "icon": "📦",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Torch Builder",
         "category": "Distribution",
         "description": "Build and configure AI models and settings",
         "replicate_model": "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-        "inputs": {"prompt": "text", "negative_prompt": "text"},
-        "icon": "🔧"
+        "inputs": {"prompt": "text", "negative_prompt": "text", "seed": "integer"},
+        "icon": "🔧",
+        "cache": {"mode": "seeded", "ttl": 3000}
     },
     {
         "name": "Distribution",
         "category": "Distribution",
         "description": "Optimize and prepare for various platforms",
         "replicate_model": "stability-ai/stable-video-diffusion:3f0457e4619daac51203dedb1a4c069c4c2f5b9bab8c0bb78c1d0b8d6ab77e0c",
-        "inputs": {"video": "video", "platform": "text"},
-        "icon": "🌐"
+        "inputs": {"video": "video", "platform": "text", "seed": "integer"},
+        "icon": "🌐",
+        "cache": {"mode": "seeded", "ttl": 3000}
     }
 ]
 
+# Input validation
+# Each tool's "inputs" spec compiles to a Pydantic model that requests are
+# checked against before any model call. The first declared input is
+# required and must not be blank; the others are optional. Undeclared keys
+# are passed to the model as they are, so they are held to scalar values
+# (text no longer than a declared text input) and a handful per request.
+TOOL_INPUT_MAX_CHARS = int(os.getenv("TOOL_INPUT_MAX_CHARS", "10000"))
+TOOL_INPUT_MAX_EXTRA = int(os.getenv("TOOL_INPUT_MAX_EXTRA", "16"))
+# Largest media input accepted inline as a base64 data URI (decoded bytes).
+# Kept well under MongoDB's 16 MiB document limit once base64-encoded; bigger
+# files go through POST /api/media
+MEDIA_DATA_URI_MAX_BYTES = int(os.getenv("MEDIA_DATA_URI_MAX_BYTES", str(10 * 1024 ** 2)))
+MEDIA_INPUT_TYPES = ("image", "audio", "video")
+
+class InvalidInputs(Exception):
+    """Tool inputs that do not match the tool's spec"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in errors))
+        self.errors = errors
+
+def invalid_inputs_exception(e):
+    """The 422 response for inputs that failed validation"""
+    return HTTPException(status_code=422, detail=e.errors)
+
+def not_blank(value):
+    if not value.strip():
+        raise ValueError("must not be blank")
+    return value
+
+def media_input(kind):
+    """Validator for an image/audio/video input value"""
+    def check(value):
+        match = MEDIA_URL_PATTERN.search(value)
+        if match and value == media_url(match.group(1)):
+            # Existence and type are checked against db.media afterwards
+            return value
+        match = DATA_URI_PATTERN.match(value)
+        if match:
+            if not match.group(1).lower().startswith(f"{kind}/"):
+                raise ValueError(f"expected {kind} data, got {match.group(1)}")
+            if (len(value) - match.end()) * 3 // 4 > MEDIA_DATA_URI_MAX_BYTES:
+                raise ValueError(f"inline {kind} exceeds {MEDIA_DATA_URI_MAX_BYTES} bytes; upload it to /api/media instead")
+            return value
+        if value.startswith(("http://", "https://")):
+            return value
+        raise ValueError(f"expected an uploaded {kind} URL from /api/media, a data URI or an http(s) URL")
+    return check
+
+def extra_input_error(value):
+    """Why an undeclared input value is refused, or None"""
+    if value is None or type(value) in (bool, int, float):
+        return None
+    if type(value) is not str:
+        return "undeclared inputs must be text, numbers or booleans"
+    if len(value) > TOOL_INPUT_MAX_CHARS:
+        return f"String should have at most {TOOL_INPUT_MAX_CHARS} characters"
+    return None
+
+INPUT_TYPES = {
+    "text": Annotated[StrictStr, StringConstraints(max_length=TOOL_INPUT_MAX_CHARS)],
+    "integer": StrictInt,
+    **{kind: Annotated[StrictStr, AfterValidator(media_input(kind))] for kind in MEDIA_INPUT_TYPES}
+}
+
+class InputSchema:
+    """A tool's compiled inputs spec
+
+    ``check`` is the fast path: plain type and length tests that accept
+    well-formed text/integer inputs without building a model. Anything it
+    does not vouch for (media values, or a request that is actually wrong)
+    goes through the Pydantic model, which also produces the error details.
+    The model lets undeclared keys through, so ``extra_errors`` caps those.
+    """
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.kinds = dict(tool.inputs)
+        self.required = next(iter(self.kinds), None)
+        self.media = {name: kind for name, kind in self.kinds.items() if kind in MEDIA_INPUT_TYPES}
+        fields = {}
+        for name, kind in self.kinds.items():
+            if kind not in INPUT_TYPES:
+                raise ValueError(f"Tool {tool.name} has unknown input type {kind!r} for {name}")
+            if name == self.required:
+                field_type = INPUT_TYPES[kind]
+                if kind == "text":
+                    field_type = Annotated[field_type, AfterValidator(not_blank)]
+                fields[name] = (field_type, ...)
+            else:
+                fields[name] = (Optional[INPUT_TYPES[kind]], None)
+        self.model = create_model(
+            re.sub(r"\W", "", tool.name) + "Inputs",
+            __config__=ConfigDict(extra="allow"),
+            **fields
+        )
+
+    def check(self, inputs):
+        """True when ``inputs`` plainly fit the spec"""
+        kinds = self.kinds
+        if self.required is not None and self.required not in inputs:
+            return False
+        extras = 0
+        for name, value in inputs.items():
+            kind = kinds.get(name)
+            if kind is None:
+                extras += 1
+                if extras > TOOL_INPUT_MAX_EXTRA or extra_input_error(value) is not None:
+                    return False
+                continue
+            if value is None:
+                if name == self.required:
+                    return False
+            elif kind == "text":
+                if type(value) is not str or len(value) > TOOL_INPUT_MAX_CHARS:
+                    return False
+                if name == self.required and (not value or value.isspace()):
+                    return False
+            elif kind != "integer" or type(value) is not int:
+                return False
+        return True
+
+    async def validate(self, inputs):
+        """Raise InvalidInputs unless ``inputs`` fit the spec"""
+        if self.check(inputs):
+            return
+        errors = []
+        try:
+            self.model.model_validate(inputs)
+        except ValidationError as e:
+            errors = [
+                {"loc": ["inputs", *error["loc"]], "msg": error["msg"], "type": error["type"]}
+                for error in e.errors(include_url=False)
+            ]
+        errors += self.extra_errors(inputs)
+        if errors:
+            raise InvalidInputs(errors)
+        await self.check_media(inputs)
+
+    def extra_errors(self, inputs):
+        """Error details for undeclared inputs that are too big or too many"""
+        extras = [name for name in inputs if name not in self.kinds]
+        errors = []
+        if len(extras) > TOOL_INPUT_MAX_EXTRA:
+            errors.append({"loc": ["inputs"], "msg": f"at most {TOOL_INPUT_MAX_EXTRA} undeclared inputs are allowed", "type": "too_many_extra"})
+        for name in extras:
+            msg = extra_input_error(inputs[name])
+            if msg is not None:
+                errors.append({"loc": ["inputs", name], "msg": msg, "type": "extra_input"})
+        return errors
+
+    async def check_media(self, inputs):
+        """Uploaded media inputs must exist and be of the declared kind"""
+        handles = {}
+        for name, kind in self.media.items():
+            match = MEDIA_URL_PATTERN.search(inputs.get(name) or "")
+            if match:
+                handles[name] = match.group(1)
+        if not handles:
+            return
+        stored = {
+            media["hash"]: media["content_type"]
+            async for media in db.media.find({"hash": {"$in": list(handles.values())}}, {"_id": 0, "hash": 1, "content_type": 1})
+        }
+        errors = []
+        for name, digest in handles.items():
+            kind = self.media[name]
+            if digest not in stored:
+                errors.append({"loc": ["inputs", name], "msg": "unknown media; upload it to /api/media first", "type": "media_missing"})
+            elif not stored[digest].startswith(f"{kind}/"):
+                errors.append({"loc": ["inputs", name], "msg": f"expected {kind}, got {stored[digest]}", "type": "media_type"})
+        if errors:
+            raise InvalidInputs(errors)
+
+def input_schema(tool):
+    """The compiled schema for a tool, as cached by the current registry"""
+    schema = tool_registry.schemas.get(tool.name)
+    if schema is None or schema.tool is not tool:
+        # The registry was swapped since this tool was looked up
+        schema = InputSchema(tool)
+    return schema
+
+async def offload_inputs(inputs):
+    """``inputs`` with inline data URIs moved to the blob store
+
+    Records, jobs and pipelines then keep a /api/media handle rather than
+    the base64 payload; model_inputs inlines it again for the model call.
+    """
+    if not any(isinstance(value, str) and DATA_URI_PATTERN.match(value) for value in inputs.values()):
+        return inputs
+    offloaded = {}
+    for name, value in inputs.items():
+        if isinstance(value, str) and DATA_URI_PATTERN.match(value):
+            value, _ = await offload_media(value)
+        offloaded[name] = value
+    return offloaded
+
+async def validate_inputs(tool, inputs):
+    """Raise InvalidInputs for bad inputs; return them ready to store"""
+    await input_schema(tool).validate(inputs)
+    return await offload_inputs(inputs)
+
+# Tool registry
+# Path to a JSON file with the same shape as AI_TOOLS; when set it replaces
+# the built-in catalogue and is re-read whenever it changes on disk
+TOOLS_CONFIG_FILE = os.getenv("TOOLS_CONFIG_FILE", "")
+TOOLS_CONFIG_POLL_INTERVAL = float(os.getenv("TOOLS_CONFIG_POLL_INTERVAL", "5"))
+
+def render_json(content):
+    """Encode a response body once, the way MongoJSONResponse would
+
+    Returns ``(body, etag, variants)`` with the body precompressed in every
+    encoding that makes it smaller.
+    """
+    body = encode_json(content)
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', precompress(body)
+
+class ToolRegistry:
+    """Immutable, indexed view of the tool catalogue
+
+    Lookups by name and category are dict hits, and the /api/tools payloads
+    are rendered to bytes (with strong ETags) once per catalogue version.
+    """
+
+    def __init__(self, tool_definitions):
+        self.tools = tuple(ToolModel(**definition) for definition in tool_definitions)
+        self.by_name = {tool.name: tool for tool in self.tools}
+        if len(self.by_name) != len(self.tools):
+            raise ValueError("Tool names must be unique")
+        self.schemas = {tool.name: InputSchema(tool) for tool in self.tools}
+
+        categories = {}
+        for tool in self.tools:
+            categories.setdefault(tool.category, []).append(tool)
+        self.by_category = {category: tuple(tools) for category, tools in categories.items()}
+
+        self.rendered = render_json({"tools": [tool.model_dump() for tool in self.tools]})
+        self.rendered_categories = {
+            category: render_json({"tools": [tool.model_dump() for tool in tools], "category": category})
+            for category, tools in self.by_category.items()
+        }
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def render_category(self, category):
+        rendered = self.rendered_categories.get(category)
+        if rendered is None:
+            rendered = render_json({"tools": [], "category": category})
+        return rendered
+
+def load_tool_definitions():
+    """Read tool definitions from TOOLS_CONFIG_FILE, or use the built-ins"""
+    if not TOOLS_CONFIG_FILE:
+        return AI_TOOLS
+    with open(TOOLS_CONFIG_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+tool_registry = ToolRegistry(load_tool_definitions())
+tools_config_watcher = None
+
+async def watch_tools_config():
+    """Swap in a new registry whenever the tools config file changes"""
+    global tool_registry
+    last_mtime = os.path.getmtime(TOOLS_CONFIG_FILE)
+    while True:
+        await asyncio.sleep(TOOLS_CONFIG_POLL_INTERVAL)
+        try:
+            mtime = os.path.getmtime(TOOLS_CONFIG_FILE)
+            if mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            # A broken edit keeps the previous catalogue in service
+            tool_registry = ToolRegistry(load_tool_definitions())
+            logger.info("Reloaded %d tools from %s", len(tool_registry.tools), TOOLS_CONFIG_FILE)
+        except (OSError, ValueError, ValidationError) as e:
+            logger.error("Ignoring invalid tools config %s: %s", TOOLS_CONFIG_FILE, e)
+
+@app.on_event("startup")
+async def start_tools_config_watcher():
+    global tools_config_watcher
+    if TOOLS_CONFIG_FILE:
+        tools_config_watcher = asyncio.create_task(watch_tools_config())
+
+@app.on_event("shutdown")
+async def stop_tools_config_watcher():
+    if tools_config_watcher:
+        tools_config_watcher.cancel()
+
+def cached_json_response(request, rendered):
+    """Serve pre-rendered JSON, answering 304 when the client copy is current"""
+    body, etag, variants = rendered
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding in variants:
+        # Each encoding is its own representation with its own validator
+        etag = f'{etag[:-1]}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if encoding in variants:
+        headers["Content-Encoding"] = encoding
+        record_compression(encoding, "precompressed", len(body), len(variants[encoding]))
+        body = variants[encoding]
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -315,100 +2155,1380 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "AI Filmmaking Platform"}
 
+# Runtime counters
+@app.get("/api/stats")
+async def get_stats():
+    return {
+        "worker": {"id": WORKER_ID, "workers": WORKERS},
+        "singleflight": {
+            "in_flight": len(singleflight.calls),
+            "leaders": singleflight.leaders,
+            "coalesced": singleflight.coalesced
+        },
+        "replicate_http": replicate_transport.stats() if replicate_transport else None,
+        "scheduler": {model_ref: limiter.stats() for model_ref, limiter in model_limiters.items()},
+        "retention": last_retention_report,
+        "execution_log": execution_log.stats() if execution_log else {"enabled": False}
+    }
+
+# Prometheus metrics
+@app.get("/metrics")
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Get all tools
 @app.get("/api/tools")
-async def get_tools():
-    return {"tools": AI_TOOLS}
+async def get_tools(request: Request):
+    return cached_json_response(request, tool_registry.rendered)
 
 # Get tools by category
 @app.get("/api/tools/category/{category}")
-async def get_tools_by_category(category: str):
-    filtered_tools = [tool for tool in AI_TOOLS if tool["category"] == category]
-    return {"tools": filtered_tools, "category": category}
+async def get_tools_by_category(category: str, request: Request):
+    return cached_json_response(request, tool_registry.render_category(category))
+
+def is_live_mode():
+    """True when real Replicate calls should be made"""
+    return bool(replicate_client and replicate_api_token)
+
+def find_tool(tool_name):
+    """Look up a tool definition by name"""
+    return tool_registry.get(tool_name)
+
+def demo_result(tool_name):
+    """Canned output used when no Replicate token is configured"""
+    return DUMMY_RESPONSES.get(tool_name, f"Demo output for {tool_name}: This is a placeholder result. Add your Replicate API token to get real AI-generated content.")
+
+async def build_execution(tool_name, inputs, result, project_id, is_demo):
+    """Return a new execution record, ready to insert
+
+    Inline media in ``result`` (and the output file of an image tool) is
+    moved to the blob store first, so the record and the returned ``result``
+    only hold a reference.
+    """
+    result, media = await offload_media(result)
+    tool = find_tool(tool_name)
+    if (not media and tool and model_class(tool.replicate_model) == "image"
+            and isinstance(result, str) and result.startswith(("http://", "https://")) and result.count("://") == 1):
+        media = await fetch_media(result)
+        if media:
+            result = media_url(media["hash"])
+    schedule_renditions(media)
+    TOOL_EXECUTIONS.inc(tool_name, "demo" if is_demo else "live")
+    result_bytes = result_size(result, media)
+    TOOL_RESULT_BYTES.observe(result_bytes, tool_name)
+    execution_record = {
+        "id": str(uuid.uuid4()),
+        "tool_name": tool_name,
+        "inputs": inputs,
+        "result": result,
+        "result_media": media,
+        "result_bytes": result_bytes,
+        "project_id": project_id,
+        "created_at": utcnow(),
+        "is_demo": is_demo
+    }
+    if is_demo and DEMO_EXECUTION_TTL:
+        execution_record["expires_at"] = execution_record["created_at"] + timedelta(seconds=DEMO_EXECUTION_TTL)
+    return execution_record
+
+# Execution log
+# With EXECUTION_WRITE_BEHIND=true, execute, stream and batch requests return
+# as soon as their execution record is queued here; a background task writes
+# the queue with insert_many once EXECUTION_FLUSH_SIZE records are waiting or
+# the oldest has waited EXECUTION_FLUSH_INTERVAL seconds. Durability: queued
+# records are flushed on a clean shutdown, and a failed write is retried with
+# the records kept in order, but records still queued when the process dies
+# (kill -9, OOM, power loss) are lost although their ids were returned. Jobs
+# and pipelines always write before finishing, since their documents point at
+# the execution. Once EXECUTION_QUEUE_MAX records are queued (Mongo slow or
+# down), new executions wait for the next flush before returning. Records
+# MongoDB refuses outright (e.g. over 16 MiB) are logged and dropped instead of
+# retried, and counted as dead_lettered in /api/stats.
+EXECUTION_WRITE_BEHIND = os.getenv("EXECUTION_WRITE_BEHIND", "false").lower() == "true"
+EXECUTION_FLUSH_SIZE = int(os.getenv("EXECUTION_FLUSH_SIZE", "200"))
+EXECUTION_FLUSH_INTERVAL = float(os.getenv("EXECUTION_FLUSH_INTERVAL", "0.05"))
+EXECUTION_QUEUE_MAX = int(os.getenv("EXECUTION_QUEUE_MAX", "5000"))
+# Longest pause between retries of a failed flush
+EXECUTION_FLUSH_MAX_BACKOFF = 5.0
+
+# Failures worth retrying the same batch for: the server was unreachable,
+# busy or stepping down, not a problem with the records themselves
+RETRYABLE_WRITE_ERRORS = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+RETRYABLE_WRITE_CODES = {6, 7, 50, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+def rejected_writes(error):
+    """Batch index -> reason for records a bulk insert refused for good
+
+    Duplicates are records a retried batch already wrote. Raises ``error``
+    when any failure is transient, so the whole batch is retried.
+    """
+    if error.details.get("writeConcernErrors"):
+        raise error
+    rejected = {}
+    for item in error.details.get("writeErrors", []):
+        if item.get("code") in RETRYABLE_WRITE_CODES:
+            raise error
+        if item.get("code") != 11000:
+            rejected[item["index"]] = item.get("errmsg") or f"code {item.get('code')}"
+    return rejected
+
+class ExecutionLog:
+    """Bounded write-behind queue of execution records
+
+    ``pending`` maps execution id to its record until the record is stored,
+    so GET /api/executions/{id} can answer from this worker straight away.
+    Only the flusher task (or ``close``) writes, so batches never overlap.
+    """
+
+    def __init__(self, batch_size, interval, max_queued):
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_queued = max(self.batch_size, max_queued)
+        self.queue = deque()
+        self.pending = {}
+        self.has_records = asyncio.Event()
+        self.batch_ready = asyncio.Event()
+        self.flushed = asyncio.Event()
+        self.task = None
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.waits = 0
+        self.dead_lettered = 0
+        self.last_error = None
+
+    async def add(self, records):
+        """Queue records for insertion, waiting while the queue is full"""
+        if self.queue and len(self.queue) + len(records) > self.max_queued:
+            self.waits += 1
+            with EXECUTION_LOG_WAIT_SECONDS.time():
+                # A batch bigger than the whole queue goes in once it is empty
+                while self.queue and len(self.queue) + len(records) > self.max_queued:
+                    self.flushed.clear()
+                    await self.flushed.wait()
+        for record in records:
+            self.queue.append(record)
+            self.pending[record["id"]] = record
+        self.has_records.set()
+        if len(self.queue) >= self.batch_size:
+            self.batch_ready.set()
+
+    async def insert_each(self, batch):
+        """Insert records one at a time; returns the rejected ones like rejected_writes"""
+        rejected = {}
+        for index, record in enumerate(batch):
+            try:
+                await db.executions.insert_one(record)
+            except DuplicateKeyError:
+                pass
+            except RETRYABLE_WRITE_ERRORS:
+                raise
+            except Exception as e:
+                rejected[index] = str(e) or type(e).__name__
+        return rejected
+
+    async def flush_batch(self):
+        """Insert the oldest batch
+
+        Raises (keeping the records) when Mongo is unreachable or busy.
+        Records Mongo will never accept, e.g. over 16 MiB, are dead-lettered:
+        logged and dropped, so they cannot hold up the records behind them.
+        """
+        batch = [self.queue[index] for index in range(min(self.batch_size, len(self.queue)))]
+        try:
+            with MONGO_SECONDS.time("insert_executions"):
+                await db.executions.insert_many(batch, ordered=False)
+            rejected = {}
+        except RETRYABLE_WRITE_ERRORS:
+            raise
+        except BulkWriteError as e:
+            rejected = rejected_writes(e)
+        except Exception:
+            # Refused client-side (DocumentTooLarge, InvalidDocument) without
+            # saying which record; find out one record at a time
+            rejected = await self.insert_each(batch)
+        for index, reason in rejected.items():
+            record = batch[index]
+            logger.error("Dead-lettered execution %s (%s, project %s): %s",
+                         record["id"], record["tool_name"], record["project_id"], reason)
+        for _ in batch:
+            del self.pending[self.queue.popleft()["id"]]
+        self.dead_lettered += len(rejected)
+        batch = [record for index, record in enumerate(batch) if index not in rejected]
+        self.written += len(batch)
+        self.batches += 1
+        if not self.queue:
+            self.has_records.clear()
+        if len(self.queue) < self.batch_size:
+            self.batch_ready.clear()
+        self.flushed.set()
+        if not batch:
+            return
+        try:
+            await update_project_stats(batch)
+        except Exception as e:
+            logger.error("Failed to update project stats for %d executions: %s", len(batch), e)
+
+    async def run(self):
+        backoff = 0.1
+        while True:
+            await self.has_records.wait()
+            if len(self.queue) < self.batch_size:
+                # Give a partial batch up to one interval to fill
+                try:
+                    await asyncio.wait_for(self.batch_ready.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush_batch()
+                backoff = 0.1
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error("Failed to write %d queued executions, retrying in %.1fs: %s",
+                             len(self.queue), backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, EXECUTION_FLUSH_MAX_BACKOFF)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def close(self, attempts=3):
+        """Stop the flusher and write whatever is still queued"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for _ in range(attempts):
+            if not self.queue:
+                return
+            try:
+                while self.queue:
+                    await self.flush_batch()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Failed to flush executions on shutdown: %s", e)
+        if self.queue:
+            logger.error("Dropping %d queued executions that could not be written", len(self.queue))
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "queued": len(self.queue),
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "waits": self.waits,
+            "dead_lettered": self.dead_lettered,
+            "last_error": self.last_error
+        }
+
+execution_log = ExecutionLog(
+    EXECUTION_FLUSH_SIZE, EXECUTION_FLUSH_INTERVAL, EXECUTION_QUEUE_MAX
+) if EXECUTION_WRITE_BEHIND else None
+
+@app.on_event("startup")
+async def start_execution_log():
+    if execution_log:
+        execution_log.start()
+
+@app.on_event("shutdown")
+async def flush_execution_log():
+    if execution_log:
+        await execution_log.close()
+
+async def store_execution(tool_name, inputs, result, project_id, is_demo, durable=False):
+    """Persist an execution record and return it
+
+    In write-behind mode the record is only queued unless ``durable`` is set.
+    """
+    execution_record = await build_execution(tool_name, inputs, result, project_id, is_demo)
+    if execution_log and not durable:
+        await execution_log.add([execution_record])
+        return execution_record
+    with MONGO_SECONDS.time("insert_execution"):
+        await db.executions.insert_one(execution_record)
+    await update_project_stats([execution_record])
+    return execution_record
+
+# Project stats
+# Each project carries running aggregates of its executions (count per tool,
+# last run, total result bytes and a reference to the latest result), kept
+# current by the execute paths and rebuilt by the backfill-project-stats command
+# Characters of a text result copied into stats.last_result
+PROJECT_PREVIEW_CHARS = 280
+
+def result_size(result, media):
+    """Bytes a result stands for: the stored media, or the encoded text"""
+    if media:
+        return media["size"]
+    if isinstance(result, str):
+        return len(result.encode())
+    return len(encode_json(result))
+
+def stats_key(tool_name):
+    """Tool names become field names under stats.tools"""
+    return tool_name.replace(".", "_").lstrip("$")
+
+def last_result(record):
+    """The small reference to an execution kept on its project"""
+    return {
+        "execution_id": record["id"],
+        "tool_name": record["tool_name"],
+        "result_media": record["result_media"],
+        # Text results can be long; the full payload is one request away
+        "preview": record["result"][:PROJECT_PREVIEW_CHARS]
+        if isinstance(record["result"], str) and not record["result_media"] else None,
+        "created_at": record["created_at"]
+    }
+
+async def update_project_stats(execution_records):
+    """Fold new executions into their projects' aggregates
+
+    One update per project: counters are bumped with $inc and timestamps
+    moved forward with $max, so concurrent writers never lose a run and the
+    dashboard renders from the project document alone.
+    """
+    updates, newest = {}, {}
+    for record in execution_records:
+        project_id = record["project_id"]
+        if not project_id:
+            continue
+        update = updates.setdefault(project_id, {"$inc": {}, "$max": {}, "$addToSet": {"tools_used": {"$each": []}}})
+        key = stats_key(record["tool_name"])
+        for field, amount in (("stats.executions", 1), (f"stats.tools.{key}.count", 1),
+                              ("stats.total_bytes", record["result_bytes"])):
+            update["$inc"][field] = update["$inc"].get(field, 0) + amount
+        for field in ("updated_at", "stats.last_run_at", f"stats.tools.{key}.last_run_at"):
+            update["$max"][field] = max(record["created_at"], update["$max"].get(field, record["created_at"]))
+        if record["tool_name"] not in update["$addToSet"]["tools_used"]["$each"]:
+            update["$addToSet"]["tools_used"]["$each"].append(record["tool_name"])
+        if project_id not in newest or record["created_at"] >= newest[project_id]["created_at"]:
+            newest[project_id] = record
+
+    for project_id, update in updates.items():
+        record = newest[project_id]
+        with MONGO_SECONDS.time("update_project_stats"):
+            await db.projects.update_one({"id": project_id}, update)
+            # Only the newest run may replace last_result, so a slow writer
+            # finishing late does not clobber a more recent reference
+            await db.projects.update_one(
+                {"id": project_id, "$or": [
+                    {"stats.last_result.created_at": {"$lte": record["created_at"]}},
+                    {"stats.last_result": {"$exists": False}}
+                ]},
+                {"$set": {"stats.last_result": last_result(record)}}
+            )
+
+async def backfill_project_stats():
+    """Rebuild every project's aggregates from its stored executions
+
+    Safe to re-run: stats are recomputed and replaced, not incremented.
+    Executions archived by retention still count, with their recorded size.
+    """
+    size = {"$ifNull": ["$result_bytes", {"$ifNull": ["$result_media.size", {"$cond": [
+        {"$eq": [{"$type": "$result"}, "string"]}, {"$strLenBytes": "$result"}, 0
+    ]}]}]}
+    pipeline = [
+        {"$match": {"project_id": {"$ne": None}}},
+        {"$sort": {"project_id": 1, "created_at": -1, "_id": -1}},
+        {"$group": {
+            "_id": {"project_id": "$project_id", "tool_name": "$tool_name"},
+            "count": {"$sum": 1},
+            "bytes": {"$sum": size},
+            "last_run_at": {"$max": "$created_at"},
+            "last": {"$first": {
+                "id": "$id",
+                "tool_name": "$tool_name",
+                "result": "$result",
+                "result_media": "$result_media",
+                "created_at": "$created_at"
+            }}
+        }}
+    ]
+    projects, tool_names = {}, {}
+    async for group in db.executions.aggregate(pipeline, allowDiskUse=True):
+        tool_names.setdefault(group["_id"]["project_id"], []).append(group["_id"]["tool_name"])
+        stats = projects.setdefault(group["_id"]["project_id"], {
+            "executions": 0, "total_bytes": 0, "last_run_at": None, "tools": {}, "last_result": None
+        })
+        stats["executions"] += group["count"]
+        stats["total_bytes"] += group["bytes"]
+        stats["tools"][stats_key(group["_id"]["tool_name"])] = {
+            "count": group["count"], "last_run_at": group["last_run_at"]
+        }
+        last = group["last"]
+        last.setdefault("result", None)
+        last.setdefault("result_media", None)
+        if stats["last_result"] is None or last["created_at"] > stats["last_result"]["created_at"]:
+            stats["last_run_at"] = last["created_at"]
+            stats["last_result"] = last_result(last)
+
+    updated = 0
+    async for project in db.projects.find({}, {"_id": 0, "id": 1}):
+        stats = projects.get(project["id"], {"executions": 0, "total_bytes": 0, "tools": {}})
+        update = {"$set": {"stats": {key: value for key, value in stats.items() if value is not None}}}
+        if project["id"] in tool_names:
+            update["$addToSet"] = {"tools_used": {"$each": tool_names[project["id"]]}}
+        if stats.get("last_run_at"):
+            update["$max"] = {"updated_at": stats["last_run_at"]}
+        await db.projects.update_one({"id": project["id"]}, update)
+        updated += 1
+    return updated
+
+async def run_tool(tool, inputs, project_id=None):
+    """Return ``(result, cache_status)`` for one synchronous execution"""
+    if not is_live_mode():
+        # Use dummy data for demo
+        return demo_result(tool.name), "off"
+    try:
+        with TOOL_RUN_SECONDS.time(tool.name, tool.replicate_model):
+            # Execute with Replicate, reusing cached results for repeat inputs
+            return await run_tool_cached(tool, inputs, project_id=project_id)
+    except Exception as e:
+        TOOL_ERRORS.inc(tool.name, type(e).__name__)
+        raise
+
+def execution_response(execution_record, cache_status):
+    """Response body for a finished execution"""
+    return {
+        "success": True,
+        "result": execution_record["result"],
+        "result_media": execution_record["result_media"],
+        "execution_id": execution_record["id"],
+        "is_demo": execution_record["is_demo"],
+        "cache": cache_status
+    }
 
 # Execute tool
 @app.post("/api/tools/execute")
-async def execute_tool(request: ToolRequest):
+async def execute_tool(request: ToolRequest, http_request: Request):
     try:
         # Find the tool
-        tool = next((t for t in AI_TOOLS if t["name"] == request.tool_name), None)
+        tool = find_tool(request.tool_name)
         if not tool:
             raise HTTPException(status_code=404, detail="Tool not found")
+        request.inputs = await validate_inputs(tool, request.inputs)
+
+        if request.async_mode:
+            job = await enqueue_job(request, tool)
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "is_demo": job["is_demo"]
+            })
         
-        # Check if we have a real API key or use dummy data
-        if replicate_client and replicate_api_token:
-            # Execute with Replicate
-            result = replicate_client.run(
-                tool["replicate_model"],
-                input=request.inputs
-            )
-            
-            # Handle different result types
-            if hasattr(result, '__iter__') and not isinstance(result, (str, bytes)):
-                # It's a generator or list, join the output
-                result = ''.join(str(item) for item in result)
-            elif not isinstance(result, (str, dict, list, int, float, bool)):
-                # Convert other types to string
-                result = str(result)
-        else:
-            # Use dummy data for demo
-            result = DUMMY_RESPONSES.get(request.tool_name, f"Demo output for {request.tool_name}: This is a placeholder result. Add your Replicate API token to get real AI-generated content.")
+        result, cache_status = await run_tool(tool, request.inputs, request.project_id)
         
         # Store result in database
-        execution_record = {
-            "id": str(uuid.uuid4()),
-            "tool_name": request.tool_name,
-            "inputs": request.inputs,
-            "result": result,
-            "project_id": request.project_id,
-            "created_at": "2025-01-01T00:00:00Z",
-            "is_demo": not bool(replicate_client and replicate_api_token)
-        }
+        execution_record = await store_execution(
+            request.tool_name,
+            request.inputs,
+            result,
+            request.project_id,
+            not is_live_mode()
+        )
         
-        await db.executions.insert_one(execution_record)
+        if execution_record["is_demo"]:
+            # Demo bodies repeat per tool apart from the execution id
+            return template_response(http_request, execution_response(execution_record, cache_status), "execution_id")
+        return execution_response(execution_record, cache_status)
         
-        return {
-            "success": True,
-            "result": result,
+    except HTTPException:
+        raise
+    except InvalidInputs as e:
+        raise invalid_inputs_exception(e)
+    except SchedulerBusy as e:
+        raise busy_exception(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tool execution failed: {str(e)}")
+
+# Batch execution
+# Cap on invocations per batch request, and on how many of one batch run at
+# once (per-model limits still apply on top)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "64"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+async def run_batch_item(index, request, semaphore):
+    """Run one batch entry and return ``(response, execution_record)``
+
+    Failures are reported in the response instead of raised, so one bad
+    panel never sinks the rest of the batch; ``execution_record`` is None
+    for them.
+    """
+    tool = find_tool(request.tool_name)
+    if not tool:
+        return {"index": index, "success": False, "detail": "Tool not found"}, None
+    if request.async_mode:
+        return {"index": index, "success": False, "detail": "async_mode is not supported in batches"}, None
+    try:
+        request.inputs = await validate_inputs(tool, request.inputs)
+    except InvalidInputs as e:
+        return {"index": index, "success": False, "detail": e.errors}, None
+    try:
+        async with semaphore:
+            result, cache_status = await run_tool(tool, request.inputs, request.project_id)
+        execution_record = await build_execution(
+            request.tool_name,
+            request.inputs,
+            result,
+            request.project_id,
+            not is_live_mode()
+        )
+    except SchedulerBusy as e:
+        return {"index": index, "success": False, "detail": str(e), "retry_after": e.retry_after}, None
+    except Exception as e:
+        return {"index": index, "success": False, "detail": f"Tool execution failed: {str(e)}"}, None
+    return {"index": index, **execution_response(execution_record, cache_status)}, execution_record
+
+async def store_executions(execution_records):
+    """Persist a batch of execution records in one round trip"""
+    if execution_records and execution_log:
+        await execution_log.add(execution_records)
+    elif execution_records:
+        with MONGO_SECONDS.time("insert_executions"):
+            await db.executions.insert_many(execution_records, ordered=False)
+        await update_project_stats(execution_records)
+
+# Execute many tools in one request
+@app.post("/api/tools/execute/batch")
+async def execute_tool_batch(batch: BatchToolRequest):
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    if batch.stream:
+        return StreamingResponse(
+            stream_batch(batch.requests, semaphore),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        outcomes = await asyncio.gather(*(
+            run_batch_item(index, request, semaphore)
+            for index, request in enumerate(batch.requests)
+        ))
+        await store_executions([record for _, record in outcomes if record is not None])
+        return {"success": True, "results": [response for response, _ in outcomes]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch execution failed: {str(e)}")
+
+async def stream_batch(requests, semaphore):
+    """Yield each batch entry as an SSE "item" event in completion order
+
+    Entries finishing together are stored in one write before their events
+    go out, so an execution id the client holds is always stored, even if
+    it disconnects before the rest of the batch is done.
+    """
+    tasks = [
+        asyncio.create_task(run_batch_item(index, request, semaphore))
+        for index, request in enumerate(requests)
+    ]
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            outcomes = [task.result() for task in done]
+            # A disconnect must not abandon results that were already paid for
+            await asyncio.shield(store_executions([record for _, record in outcomes if record is not None]))
+            for response, _ in outcomes:
+                yield sse_event("item", response)
+        yield sse_event("done", {"success": True, "count": len(requests)})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Batch execution failed: {str(e)}"})
+    finally:
+        # Client went away: stop whatever is still running
+        for task in tasks:
+            task.cancel()
+
+# Streaming execution
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def iter_sse(url):
+    """Yield (event, data) pairs from a Replicate prediction stream URL"""
+    headers = {
+        "Accept": "text/event-stream",
+        "Cache-Control": "no-store",
+        "Authorization": f"Token {replicate_api_token}"
+    }
+    timeout = httpx.Timeout(
+        REPLICATE_HTTP_READ_TIMEOUT,
+        connect=REPLICATE_HTTP_CONNECT_TIMEOUT,
+        read=REPLICATE_TIMEOUT,
+        pool=REPLICATE_HTTP_POOL_TIMEOUT
+    )
+    async with replicate_http.stream("GET", url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        event, data = "message", []
+        async for line in response.aiter_lines():
+            if line == "":
+                if data:
+                    yield event, "\n".join(data)
+                event, data = "message", []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                value = line[5:]
+                data.append(value[1:] if value.startswith(" ") else value)
+
+async def stream_replicate_model(model_ref, inputs, project_id=None):
+    """Yield output chunks of a Replicate prediction as they are produced
+
+    Uses the prediction's stream URL when the model supports streaming and
+    otherwise emits whatever new output items appear between polls.
+    """
+    async with get_model_limiter(model_ref).slot(project_id):
+        prediction = await replicate_client.predictions.async_create(
+            version=model_version(model_ref),
+            input=await model_inputs(inputs),
+            stream=True
+        )
+        finished = False
+        try:
+            stream_url = (prediction.urls or {}).get("stream")
+            if stream_url:
+                async for event, data in iter_sse(stream_url):
+                    if event == "output":
+                        yield data
+                    elif event == "error":
+                        raise ModelError(data)
+                    elif event == "done":
+                        done = json.loads(data) if data.startswith("{") else {}
+                        if done.get("reason"):
+                            raise ModelError(f"Prediction {done['reason']}")
+                        break
+            else:
+                emitted = 0
+                deadline = time.monotonic() + REPLICATE_TIMEOUT
+                while True:
+                    if isinstance(prediction.output, list):
+                        for item in prediction.output[emitted:]:
+                            yield str(item)
+                        emitted = len(prediction.output)
+                    if prediction.status in TERMINAL_STATUSES:
+                        break
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Prediction {prediction.id} timed out after {REPLICATE_TIMEOUT:.0f}s")
+                    await asyncio.sleep(REPLICATE_POLL_INTERVAL)
+                    prediction = await replicate_client.predictions.async_get(prediction.id)
+                result = prediction_result(prediction)
+                if not isinstance(prediction.output, list) and result is not None:
+                    yield result if isinstance(result, str) else json.dumps(result)
+            finished = True
+        finally:
+            if not finished:
+                # Client went away or the model errored: stop the prediction
+                try:
+                    await replicate_client.predictions.async_cancel(prediction.id)
+                except Exception:
+                    pass
+
+async def stream_demo_result(tool_name):
+    """Yield the demo response word by word so clients exercise streaming"""
+    for chunk in re.findall(r"\S*\s*", demo_result(tool_name)):
+        if chunk:
+            yield chunk
+
+# Execute tool with streamed output
+@app.post("/api/tools/execute/stream")
+async def execute_tool_stream(request: ToolRequest):
+    tool = find_tool(request.tool_name)
+    if not tool:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    try:
+        request.inputs = await validate_inputs(tool, request.inputs)
+    except InvalidInputs as e:
+        raise invalid_inputs_exception(e)
+
+    is_demo = not is_live_mode()
+    if is_demo:
+        chunks = stream_demo_result(request.tool_name)
+    else:
+        # Turn the request away before the stream starts rather than mid-way
+        limiter = get_model_limiter(tool.replicate_model)
+        if limiter.is_full():
+            limiter.rejected += 1
+            raise busy_exception(SchedulerBusy(tool.replicate_model, limiter.retry_after()))
+        chunks = stream_replicate_model(tool.replicate_model, request.inputs, request.project_id)
+
+    async def events():
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event("token", {"token": chunk})
+            # Persist the assembled output once the model is done
+            execution_record = await store_execution(
+                request.tool_name,
+                request.inputs,
+                ''.join(parts),
+                request.project_id,
+                is_demo
+            )
+            yield sse_event("done", {
+                "success": True,
+                "result_media": execution_record["result_media"],
+                "execution_id": execution_record["id"],
+                "is_demo": is_demo
+            })
+        except Exception as e:
+            TOOL_ERRORS.inc(request.tool_name, type(e).__name__)
+            yield sse_event("error", {"detail": f"Tool execution failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Background jobs
+# Jobs live in db.jobs so they survive restarts; the in-memory queue only
+# carries ids to the worker tasks started on application startup.
+job_queue = asyncio.Queue()
+job_workers = []
+# prediction id -> event set by the webhook receiver
+prediction_waiters = {}
+
+async def enqueue_job(request, tool):
+    """Record a queued job and hand it to the worker pool"""
+    now = utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "tool_name": request.tool_name,
+        "replicate_model": tool.replicate_model,
+        "inputs": request.inputs,
+        "project_id": request.project_id,
+        "status": "queued",
+        "prediction_id": None,
+        "result": None,
+        "error": None,
+        "execution_id": None,
+        "is_demo": not is_live_mode(),
+        "owner": WORKER_ID,
+        "lease_until": lease_expiry(),
+        "created_at": now,
+        "updated_at": now
+    }
+    await db.jobs.insert_one(job)
+    job_queue.put_nowait(job["id"])
+    return job
+
+async def update_job(job_id, **fields):
+    await db.jobs.update_one({"id": job_id}, {"$set": {**fields, "updated_at": utcnow()}})
+
+async def drive_prediction(job):
+    """Create (or resume) the Replicate prediction for a job and wait for it"""
+    # Queued jobs already wait durably, so they are never turned away here
+    async with get_model_limiter(job["replicate_model"]).slot(job["project_id"], bounded=False), \
+            PREDICTION_SECONDS.time(job["replicate_model"]):
+        if job.get("prediction_id"):
+            # Resuming after a restart: the prediction is already running
+            prediction = await replicate_client.predictions.async_get(job["prediction_id"])
+        else:
+            params = {}
+            if REPLICATE_WEBHOOK_URL:
+                params["webhook"] = f"{REPLICATE_WEBHOOK_URL}/api/webhooks/replicate"
+                params["webhook_events_filter"] = ["completed"]
+            prediction = await replicate_client.predictions.async_create(
+                version=model_version(job["replicate_model"]),
+                input=await model_inputs(job["inputs"]),
+                **params
+            )
+            await update_job(job["id"], prediction_id=prediction.id)
+
+        wake = None
+        if REPLICATE_WEBHOOK_URL:
+            wake = prediction_waiters.setdefault(prediction.id, asyncio.Event())
+        try:
+            prediction = await wait_for_prediction(prediction, wake)
+        finally:
+            prediction_waiters.pop(prediction.id, None)
+        return prediction_result(prediction)
+
+async def process_job(job_id):
+    job = await claim(db.jobs, job_id)
+    # Finished, or being run by another worker
+    if not job or job["status"] in ("succeeded", "failed"):
+        return
+    await update_job(job_id, status="running")
+    try:
+        if job["is_demo"]:
+            result, cache_status = demo_result(job["tool_name"]), "off"
+        else:
+            tool = find_tool(job["tool_name"])
+            if not tool:
+                raise ValueError(f"Tool {job['tool_name']} is no longer available")
+            with TOOL_RUN_SECONDS.time(tool.name, tool.replicate_model):
+                result, cache_status = await run_tool_cached(tool, job["inputs"], lambda: drive_prediction(job))
+        execution_record = await store_execution(
+            job["tool_name"],
+            job["inputs"],
+            result,
+            job["project_id"],
+            job["is_demo"],
+            durable=True
+        )
+        await update_job(
+            job_id,
+            status="succeeded",
+            result=execution_record["result"],
+            result_media=execution_record["result_media"],
+            execution_id=execution_record["id"],
+            cache=cache_status
+        )
+    except asyncio.CancelledError:
+        # Shutting down: leave the job running so it is resumed on restart
+        raise
+    except Exception as e:
+        TOOL_ERRORS.inc(job["tool_name"], type(e).__name__)
+        await update_job(job_id, status="failed", error=str(e))
+
+async def job_worker():
+    while True:
+        job_id = await job_queue.get()
+        try:
+            await process_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # A broken job must never take the worker down with it
+            pass
+        finally:
+            job_queue.task_done()
+
+async def recover_jobs():
+    """Queue jobs interrupted by a shutdown or left by a stopped worker"""
+    for job_id in await orphans(db.jobs, ["queued", "running"]):
+        if await claim(db.jobs, job_id):
+            job_queue.put_nowait(job_id)
+
+@app.on_event("startup")
+async def start_job_workers():
+    await recover_jobs()
+    for _ in range(JOB_WORKERS):
+        job_workers.append(asyncio.create_task(job_worker()))
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    for worker in job_workers:
+        worker.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    job_workers.clear()
+    await release_leases(db.jobs)
+
+# Get job status
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    try:
+        job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return MongoJSONResponse({"job": job})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch job: {str(e)}")
+
+# Replicate webhook receiver
+@app.post("/api/webhooks/replicate")
+async def replicate_webhook(payload: dict):
+    wake = prediction_waiters.get(payload.get("id"))
+    if wake is not None:
+        wake.set()
+    return {"success": True}
+
+# Pipelines
+# A pipeline is a DAG of tool steps stored in db.pipelines. Each finished step
+# is checkpointed there (with its execution id and result reference), so a
+# resumed run only redoes the steps that did not succeed.
+PIPELINE_MAX_STEPS = int(os.getenv("PIPELINE_MAX_STEPS", "64"))
+# Step ids become field names in the pipeline document
+STEP_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# pipeline id -> task running it in this process
+pipeline_tasks = {}
+
+def step_references(value):
+    """Step ids referenced by {"$ref": ...} anywhere in an input value"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            return {value["$ref"]}
+        return set().union(*(step_references(item) for item in value.values()))
+    if isinstance(value, list):
+        return set().union(*(step_references(item) for item in value))
+    return set()
+
+def resolve_references(value, steps):
+    """Replace {"$ref": ...} values with the referenced steps' results"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            return steps[value["$ref"]]["result"]
+        return {key: resolve_references(item, steps) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, steps) for item in value]
+    return value
+
+def plan_pipeline(steps):
+    """Validate pipeline steps and return their step documents keyed by id"""
+    if not steps:
+        raise HTTPException(status_code=400, detail="Pipeline has no steps")
+    if len(steps) > PIPELINE_MAX_STEPS:
+        raise HTTPException(status_code=400, detail=f"Pipeline exceeds {PIPELINE_MAX_STEPS} steps")
+
+    step_ids = {step.id for step in steps}
+    if len(step_ids) != len(steps):
+        raise HTTPException(status_code=400, detail="Step ids must be unique")
+    planned = {}
+    for step in steps:
+        if not STEP_ID_PATTERN.match(step.id):
+            raise HTTPException(status_code=400, detail=f"Invalid step id: {step.id}")
+        if not find_tool(step.tool_name):
+            raise HTTPException(status_code=400, detail=f"Unknown tool {step.tool_name} in step {step.id}")
+        depends_on = sorted(set(step.depends_on) | step_references(step.inputs))
+        unknown = [step_id for step_id in depends_on if step_id not in step_ids]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Step {step.id} depends on unknown steps: {', '.join(unknown)}")
+        planned[step.id] = {
+            "tool_name": step.tool_name,
+            "inputs": step.inputs,
+            "depends_on": depends_on,
+            "status": "pending",
+            "execution_id": None,
+            "result": None,
+            "result_media": None,
+            "error": None,
+            "cache": None
+        }
+
+    # Peel off steps with no unfinished dependencies; anything left is a cycle
+    remaining = {step_id: set(step["depends_on"]) for step_id, step in planned.items()}
+    while remaining:
+        ready = [step_id for step_id, depends_on in remaining.items() if not depends_on]
+        if not ready:
+            raise HTTPException(status_code=400, detail=f"Pipeline has a cycle through: {', '.join(sorted(remaining))}")
+        for step_id in ready:
+            del remaining[step_id]
+        for depends_on in remaining.values():
+            depends_on.difference_update(ready)
+    return planned
+
+async def update_pipeline(pipeline_id, fields):
+    await db.pipelines.update_one({"id": pipeline_id}, {"$set": fields})
+
+async def run_pipeline_step(pipeline, step_id, steps):
+    """Execute one step and checkpoint it; failures are recorded, not raised"""
+    step = steps[step_id]
+    await update_pipeline(pipeline["id"], {f"steps.{step_id}.status": "running"})
+    try:
+        tool = find_tool(step["tool_name"])
+        if not tool:
+            raise ValueError(f"Tool {step['tool_name']} is no longer available")
+        # Records keep upstream results by reference; only the model sees the bytes
+        inputs = await validate_inputs(tool, resolve_references(step["inputs"], steps))
+        while True:
+            try:
+                result, cache_status = await run_tool(tool, inputs, pipeline["project_id"])
+                break
+            except SchedulerBusy as e:
+                # Background work waits out backpressure instead of failing
+                await asyncio.sleep(e.retry_after)
+        execution_record = await store_execution(
+            step["tool_name"],
+            inputs,
+            result,
+            pipeline["project_id"],
+            not is_live_mode(),
+            durable=True
+        )
+        step = {
+            **step,
+            "status": "succeeded",
             "execution_id": execution_record["id"],
-            "is_demo": execution_record["is_demo"]
+            "result": execution_record["result"],
+            "result_media": execution_record["result_media"],
+            "error": None,
+            "cache": cache_status
         }
-        
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        step = {**step, "status": "failed", "error": str(e)}
+    await update_pipeline(pipeline["id"], {f"steps.{step_id}": step})
+    return step
+
+async def run_pipeline(pipeline_id):
+    """Run every pending step once its dependencies have succeeded
+
+    Independent steps run concurrently. After a failure no new steps are
+    started, but steps already running finish and are checkpointed.
+    """
+    pipeline = await claim(db.pipelines, pipeline_id)
+    if not pipeline:
+        # Another worker is running it
+        return
+    steps = pipeline["steps"]
+    await update_pipeline(pipeline_id, {"status": "running"})
+    running = {}
+    try:
+        failed = False
+        while True:
+            for step_id, step in steps.items():
+                if failed or step["status"] == "succeeded" or step_id in running.values():
+                    continue
+                if all(steps[dependency]["status"] == "succeeded" for dependency in step["depends_on"]):
+                    running[asyncio.create_task(run_pipeline_step(pipeline, step_id, steps))] = step_id
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = task.result()
+                steps[running.pop(task)] = step
+                failed = failed or step["status"] == "failed"
+        succeeded = all(step["status"] == "succeeded" for step in steps.values())
+        await update_pipeline(pipeline_id, {"status": "succeeded" if succeeded else "failed", "lease_until": None})
+    finally:
+        # Shutting down: the pipeline stays "running" and resumes on restart
+        for task in running:
+            task.cancel()
+
+def start_pipeline(pipeline_id):
+    task = asyncio.create_task(run_pipeline(pipeline_id))
+    pipeline_tasks[pipeline_id] = task
+
+    def finished(task):
+        pipeline_tasks.pop(pipeline_id, None)
+        if not task.cancelled() and task.exception():
+            logger.error("Pipeline %s stopped: %s", pipeline_id, task.exception())
+    task.add_done_callback(finished)
+
+async def recover_pipelines():
+    """Resume pipelines interrupted by a shutdown or left by a stopped worker"""
+    for pipeline_id in await orphans(db.pipelines, ["queued", "running"]):
+        if pipeline_id not in pipeline_tasks:
+            start_pipeline(pipeline_id)
+
+@app.on_event("startup")
+async def resume_pipelines():
+    await recover_pipelines()
+
+@app.on_event("shutdown")
+async def stop_pipelines():
+    tasks = list(pipeline_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await release_leases(db.pipelines)
+
+# Submit a pipeline
+@app.post("/api/pipelines")
+async def create_pipeline(request: PipelineRequest):
+    steps = plan_pipeline(request.steps)
+    # Steps fed by other steps are checked once their references resolve
+    for step_id, step in steps.items():
+        if step_references(step["inputs"]):
+            step["inputs"] = await offload_inputs(step["inputs"])
+            continue
+        try:
+            step["inputs"] = await validate_inputs(find_tool(step["tool_name"]), step["inputs"])
+        except InvalidInputs as e:
+            raise HTTPException(status_code=422, detail=[
+                {**error, "loc": ["steps", step_id, *error["loc"]]} for error in e.errors
+            ])
+    try:
+        pipeline = {
+            "id": str(uuid.uuid4()),
+            "project_id": request.project_id,
+            "status": "queued",
+            "steps": steps,
+            "is_demo": not is_live_mode(),
+            "owner": WORKER_ID,
+            "lease_until": lease_expiry(),
+            "created_at": utcnow()
+        }
+        await db.pipelines.insert_one(pipeline)
+        start_pipeline(pipeline["id"])
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "pipeline_id": pipeline["id"],
+            "status": pipeline["status"]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline creation failed: {str(e)}")
+
+# Get pipeline status and step checkpoints
+@app.get("/api/pipelines/{pipeline_id}")
+async def get_pipeline(pipeline_id: str):
+    try:
+        pipeline = await db.pipelines.find_one({"id": pipeline_id}, {"_id": 0})
+        if not pipeline:
+            raise HTTPException(status_code=404, detail="Pipeline not found")
+        return MongoJSONResponse({"pipeline": pipeline})
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Tool execution failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch pipeline: {str(e)}")
+
+# Re-run the steps of a pipeline that did not succeed
+@app.post("/api/pipelines/{pipeline_id}/resume")
+async def resume_pipeline(pipeline_id: str):
+    try:
+        pipeline = await db.pipelines.find_one({"id": pipeline_id}, {"_id": 0, "status": 1})
+        if not pipeline:
+            raise HTTPException(status_code=404, detail="Pipeline not found")
+        if pipeline["status"] == "succeeded":
+            return {"success": True, "pipeline_id": pipeline_id, "status": "succeeded"}
+        # Running here, or leased by another worker
+        if pipeline_id in pipeline_tasks or not await claim(db.pipelines, pipeline_id):
+            raise HTTPException(status_code=409, detail="Pipeline is already running")
+        await update_pipeline(pipeline_id, {"status": "queued"})
+        start_pipeline(pipeline_id)
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "pipeline_id": pipeline_id,
+            "status": "queued"
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resume pipeline: {str(e)}")
+
+# Retention
+# Demo executions are deleted after demo_days. Other executions older than
+# archive_days have their inputs and result moved into gzip archives, one per
+# batch; the hot document keeps its metadata and an archive reference.
+RETENTION_DEMO_DAYS = float(os.getenv("RETENTION_DEMO_DAYS", "1"))
+RETENTION_ARCHIVE_DAYS = float(os.getenv("RETENTION_ARCHIVE_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+# Pause between batches so a large backlog never saturates Mongo
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.5"))
+# Seconds between background runs; 0 leaves retention to the CLI
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "0"))
+ARCHIVE_ROOT = os.getenv("ARCHIVE_ROOT") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")
+ARCHIVED_FIELDS = ("inputs", "result")
+
+archive_store = BLOB_STORES[MEDIA_STORAGE](ARCHIVE_ROOT)
+retention_task = None
+last_retention_report = None
+
+def retention_policy(tool_name):
+    """Retention settings for a tool; a falsy value disables that rule"""
+    tool = find_tool(tool_name)
+    policy = {"demo_days": RETENTION_DEMO_DAYS, "archive_days": RETENTION_ARCHIVE_DAYS}
+    policy.update((tool.retention if tool else None) or {})
+    return policy
+
+async def retention_batches(query):
+    """Yield bounded batches of matching executions until none are left
+
+    Each batch is deleted or archived before the next query, so every batch
+    starts from the top of what still matches.
+    """
+    while True:
+        docs = await db.executions.find(query).limit(RETENTION_BATCH_SIZE).to_list(RETENTION_BATCH_SIZE)
+        if not docs:
+            return
+        yield docs
+        if len(docs) < RETENTION_BATCH_SIZE:
+            return
+        await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+def write_archive(docs):
+    """Compress the archived fields of a batch and store them by hash"""
+    payload = {doc["id"]: {field: doc.get(field) for field in ARCHIVED_FIELDS} for doc in docs}
+    data = gzip.compress(encode_json(payload))
+    digest = hashlib.sha256(data).hexdigest()
+    archive_store.write(digest, data)
+    return digest, len(data)
+
+def read_archive(digest):
+    return orjson.loads(gzip.decompress(archive_store.read(digest)))
+
+async def load_archived_fields(execution):
+    """Return an archived execution's inputs and result"""
+    archive = await asyncio.to_thread(read_archive, execution["archive"]["hash"])
+    return archive.get(execution["id"], {})
+
+async def apply_retention(tool_name, scope, report):
+    """Run one tool's policy over executions matching ``scope``"""
+    policy = retention_policy(tool_name)
+    now = utcnow()
+
+    if policy.get("demo_days"):
+        query = {**scope, "is_demo": True, "created_at": {"$lt": now - timedelta(days=policy["demo_days"])}}
+        async for docs in retention_batches(query):
+            await db.executions.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            report["deleted"] += len(docs)
+            report["reclaimed_bytes"] += sum(len(bson_encode(doc)) for doc in docs)
+
+    if policy.get("archive_days"):
+        query = {
+            **scope,
+            "is_demo": False,
+            "created_at": {"$lt": now - timedelta(days=policy["archive_days"])},
+            "archive": {"$exists": False}
+        }
+        async for docs in retention_batches(query):
+            digest, size = await asyncio.to_thread(write_archive, docs)
+            archive = {"hash": digest, "archived_at": utcnow()}
+            await db.executions.update_many(
+                {"_id": {"$in": [doc["_id"] for doc in docs]}},
+                {"$unset": {field: "" for field in ARCHIVED_FIELDS}, "$set": {"archive": archive}}
+            )
+            for doc in docs:
+                slim = {key: value for key, value in doc.items() if key not in ARCHIVED_FIELDS}
+                report["reclaimed_bytes"] += len(bson_encode(doc)) - len(bson_encode({**slim, "archive": archive}))
+            report["archived"] += len(docs)
+            report["archive_bytes"] += size
+
+async def run_retention():
+    """Apply every tool's retention policy once and return a report"""
+    global last_retention_report
+    started = time.monotonic()
+    report = {"deleted": 0, "archived": 0, "reclaimed_bytes": 0, "archive_bytes": 0}
+    tool_names = [tool.name for tool in tool_registry.tools]
+    for tool_name in tool_names:
+        await apply_retention(tool_name, {"tool_name": tool_name}, report)
+    # Executions of tools that have left the catalogue get the defaults
+    await apply_retention(None, {"tool_name": {"$nin": tool_names}}, report)
+    report["finished_at"] = utcnow()
+    report["duration_seconds"] = round(time.monotonic() - started, 2)
+    last_retention_report = report
+    logger.info(
+        "Retention: deleted %d, archived %d, reclaimed %d bytes",
+        report["deleted"], report["archived"], report["reclaimed_bytes"]
+    )
+    return report
+
+async def retention_loop():
+    while True:
+        await asyncio.sleep(RETENTION_INTERVAL)
+        try:
+            # One worker runs each sweep; the lease outlives an interval so
+            # another takes over only if the holder stops renewing it
+            if not await acquire_lease("retention", RETENTION_INTERVAL + WORKER_LEASE_SECONDS):
+                continue
+            await run_retention()
+        except Exception as e:
+            logger.error("Retention run failed: %s", e)
+
+@app.on_event("startup")
+async def start_retention():
+    global retention_task
+    if RETENTION_INTERVAL > 0:
+        retention_task = asyncio.create_task(retention_loop())
+
+@app.on_event("shutdown")
+async def stop_retention():
+    if retention_task:
+        retention_task.cancel()
 
 # Create project
 @app.post("/api/projects")
 async def create_project(project: ProjectModel):
     try:
+        now = utcnow()
         project_data = {
             "id": str(uuid.uuid4()),
             "name": project.name,
             "description": project.description,
             "tools_used": project.tools_used,
-            "created_at": "2025-01-01T00:00:00Z",
-            "updated_at": "2025-01-01T00:00:00Z"
+            "stats": {"executions": 0, "total_bytes": 0, "tools": {}},
+            "created_at": now,
+            "updated_at": now
         }
         
-        result = await db.projects.insert_one(project_data)
+        await db.projects.insert_one(project_data)
+        # insert_one stamps the generated _id onto the dict
+        project_data.pop("_id", None)
         
-        return {
+        return MongoJSONResponse({
             "success": True,
-            "project": serialize_doc(project_data)
-        }
+            "project": project_data
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Project creation failed: {str(e)}")
 
+# Pagination
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Listing views never need the heavy inputs/result payloads
+EXECUTION_SUMMARY_PROJECTION = {"_id": 0, "inputs": 0, "result": 0}
+
+async def paginate(collection, query, after, limit, projection):
+    """Return one page of documents in insertion order and the next cursor
+
+    ``after`` is the public ``id`` of the last document of the previous page;
+    paging continues from its ``_id`` so no page ever skips or rescans rows.
+    """
+    if after:
+        anchor = await collection.find_one({"id": after}, {"_id": 1})
+        if not anchor:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = {**query, "_id": {"$gt": anchor["_id"]}}
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    next_cursor = docs[limit - 1]["id"] if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def as_utc(value):
+    """Treat naive query datetimes as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+async def paginate_recent(collection, query, since, until, before, limit, projection):
+    """Return one page of documents newest first, and the next cursor
+
+    ``since``/``until`` bound ``created_at`` (inclusive/exclusive); ``before``
+    is the public ``id`` of the last document of the previous page. Pages walk
+    the (created_at, _id) index backwards, so ties on created_at never skip
+    or repeat rows.
+    """
+    created_at = {}
+    if since:
+        created_at["$gte"] = as_utc(since)
+    if until:
+        created_at["$lt"] = as_utc(until)
+    if created_at:
+        query = {**query, "created_at": created_at}
+    if before:
+        anchor = await collection.find_one({"id": before}, {"_id": 1, "created_at": 1})
+        if not anchor:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = {**query, "$or": [
+            {"created_at": {"$lt": anchor["created_at"]}},
+            {"created_at": anchor["created_at"], "_id": {"$lt": anchor["_id"]}}
+        ]}
+
+    cursor = collection.find(query, projection).sort([("created_at", -1), ("_id", -1)])
+    docs = await cursor.limit(limit + 1).to_list(limit + 1)
+    next_cursor = docs[limit - 1]["id"] if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
 # Get projects
 @app.get("/api/projects")
-async def get_projects():
+async def get_projects(
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     try:
-        projects = await db.projects.find().to_list(100)
-        serialized_projects = serialize_doc(projects)
-        return {"projects": serialized_projects}
+        with MONGO_SECONDS.time("get_projects"):
+            projects, next_cursor = await paginate(db.projects, {}, after, limit, {"_id": 0})
+        return MongoJSONResponse({"projects": projects, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {str(e)}")
 
@@ -418,9 +3538,9 @@ async def test_replicate():
     try:
         if replicate_client and replicate_api_token:
             # Test with a simple model
-            result = replicate_client.run(
+            result = await run_replicate_model(
                 "meta/llama-2-7b-chat:8e6975e5ed6174911a6ff3d60540dfd4844201974602551e10e9e87ab143d81e",
-                input={"prompt": "Hello, this is a test from AI Filmmaking Platform"}
+                {"prompt": "Hello, this is a test from AI Filmmaking Platform"}
             )
             return {"success": True, "result": result, "mode": "live"}
         else:
@@ -434,25 +3554,221 @@ async def test_replicate():
 
 # Get project by ID
 @app.get("/api/projects/{project_id}")
-async def get_project(project_id: str):
+async def get_project(
+    project_id: str,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_executions: bool = True
+):
     try:
-        project = await db.projects.find_one({"id": project_id})
+        with MONGO_SECONDS.time("get_project"):
+            project = await db.projects.find_one({"id": project_id}, {"_id": 0})
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        # Get executions for this project
-        executions = await db.executions.find({"project_id": project_id}).to_list(100)
+        # project["stats"] already summarises the executions; the dashboard
+        # only needs the page below when it lists them
+        if not include_executions:
+            return MongoJSONResponse({"project": project})
         
-        return {
-            "project": serialize_doc(project),
-            "executions": serialize_doc(executions)
-        }
+        # Get a page of execution summaries for this project; full payloads
+        # are fetched one at a time from /api/executions/{id}
+        with MONGO_SECONDS.time("get_project_executions"):
+            executions, next_cursor = await paginate(
+                db.executions,
+                {"project_id": project_id},
+                after,
+                limit,
+                EXECUTION_SUMMARY_PROJECTION
+            )
+        
+        return MongoJSONResponse({
+            "project": project,
+            "executions": executions,
+            "next_cursor": next_cursor
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch project: {str(e)}")
 
+# Get a project's executions newest first, optionally within a time range
+@app.get("/api/projects/{project_id}/executions")
+async def get_project_executions(
+    project_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        with MONGO_SECONDS.time("get_project_executions_recent"):
+            executions, next_cursor = await paginate_recent(
+                db.executions,
+                {"project_id": project_id},
+                since,
+                until,
+                before,
+                limit,
+                EXECUTION_SUMMARY_PROJECTION
+            )
+        return MongoJSONResponse({"executions": executions, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch executions: {str(e)}")
+
+# Get recent executions across all projects
+@app.get("/api/executions")
+async def get_recent_executions(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        with MONGO_SECONDS.time("get_recent_executions"):
+            executions, next_cursor = await paginate_recent(
+                db.executions, {}, since, until, before, limit, EXECUTION_SUMMARY_PROJECTION
+            )
+        return MongoJSONResponse({"executions": executions, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch executions: {str(e)}")
+
+# Get a single execution with its full payload
+@app.get("/api/executions/{execution_id}")
+async def get_execution(execution_id: str):
+    try:
+        # Queued by write-behind and not yet stored
+        execution = execution_log.pending.get(execution_id) if execution_log else None
+        if execution:
+            return MongoJSONResponse({"execution": execution})
+        execution = await db.executions.find_one({"id": execution_id}, {"_id": 0})
+        if not execution:
+            raise HTTPException(status_code=404, detail="Execution not found")
+        if "archive" in execution:
+            execution.update(await load_archived_fields(execution))
+        return MongoJSONResponse({"execution": execution})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch execution: {str(e)}")
+
+# Upload media for tool inputs
+@app.post("/api/media", status_code=201)
+async def upload_media(request: Request):
+    """Store an image, audio or video file and return a handle for tool inputs
+
+    The body is streamed to disk and hashed as it arrives rather than parsed
+    into memory (so this takes the raw request, not an UploadFile). Identical
+    files share one blob. Pass the returned ``url`` as a tool input value.
+    """
+    try:
+        media, created = await receive_upload(request)
+        if created:
+            schedule_renditions(media)
+        return {
+            "success": True,
+            "url": media_url(media["hash"]),
+            "media": media,
+            "deduplicated": not created
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+# Serve stored media
+@app.get("/api/media/{digest}")
+async def get_media(digest: str, request: Request, size: Optional[str] = None):
+    """Stream a stored blob; ``size`` picks a downscaled image rendition"""
+    if size is not None and size not in IMAGE_RENDITION_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of: {', '.join(IMAGE_RENDITION_SIZES)}")
+    media = await db.media.find_one({"hash": digest}, {"_id": 0})
+    if not media or not await asyncio.to_thread(blob_store.exists, digest):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    headers = {}
+    if size and has_renditions(media):
+        # Non-image media and SVGs are always served as they are
+        headers["Vary"] = "Accept"
+        image_format = rendition_format(request.headers.get("accept", ""), media["content_type"])
+        try:
+            media = await image_rendition(media, size, image_format)
+            digest = media["hash"]
+        except Exception as e:
+            logger.warning("Serving %s at full size, rendition failed: %s", digest, e)
+
+    # Content-addressed, so the hash is a strong validator and never changes
+    etag = f'"{digest}"'
+    headers.update({
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    })
+    # Compressed (e.g. SVG) responses carry the weak form of the tag
+    if request.headers.get("if-none-match") in (etag, f"W/{etag}", "*"):
+        return Response(status_code=304, headers=headers)
+
+    size = media["size"]
+    start, end = 0, size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+        if not match or match.groups() == ("", ""):
+            raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{size}"})
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+        if start > end or start >= size:
+            raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = 206
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob_store.iter_range(digest, start, end - start + 1),
+        status_code=status_code,
+        media_type=media["content_type"],
+        headers=headers
+    )
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="AI Filmmaking Platform API")
+    parser.add_argument("command", nargs="?", default="serve", choices=["serve", "indexes", "migrate-timestamps", "retention", "backfill-project-stats"],
+                        help="serve the API (default), report index usage, convert placeholder "
+                             "timestamps, apply retention policies once or rebuild project stats")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="API processes to serve with (default WEB_CONCURRENCY or 1)")
+    parser.add_argument("--port", type=int, default=8001, help="port to listen on (default 8001)")
+    args = parser.parse_args()
+
+    if args.command == "indexes":
+        asyncio.run(report_index_usage())
+    elif args.command == "migrate-timestamps":
+        asyncio.run(migrate_timestamps())
+    elif args.command == "retention":
+        report = asyncio.run(run_retention())
+        print(f"Deleted {report['deleted']} demo executions, archived {report['archived']} "
+              f"({report['archive_bytes']} bytes compressed), reclaimed {report['reclaimed_bytes']} bytes "
+              f"in {report['duration_seconds']}s")
+    elif args.command == "backfill-project-stats":
+        print(f"Rebuilt stats on {asyncio.run(backfill_project_stats())} projects")
+    else:
+        import uvicorn
+        if args.workers > 1:
+            # Workers import the app themselves and size their share of the
+            # scheduler limits from WEB_CONCURRENCY
+            os.environ["WEB_CONCURRENCY"] = str(args.workers)
+            uvicorn.run("server:app", host="0.0.0.0", port=args.port, workers=args.workers,
+                        app_dir=os.path.dirname(os.path.abspath(__file__)))
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=args.port)
\ No newline at end of file
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+In-process tests of the scheduler, single-flight and write-behind log
+
+Boots server.py and replicate_stub.py in this process (as bench_api.py does)
+with an in-memory MongoDB and deliberately small limits, so races and
+backpressure that a deployed server cannot be pushed into on demand can be
+driven deterministically. Run from the backend directory:
+
+    pip install -r requirements-bench.txt
+    python stub_test.py
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import uvicorn
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+STUB_PORT, API_PORT = free_port(), free_port()
+# server.py reads its settings at import time
+os.environ.update({
+    "REPLICATE_API_TOKEN": "stub",
+    "REPLICATE_BASE_URL": f"http://127.0.0.1:{STUB_PORT}",
+    "REPLICATE_POLL_INTERVAL": "0.02",
+    "DATABASE_NAME": f"stub_test_{uuid.uuid4().hex[:8]}",
+    "MEDIA_ROOT": tempfile.mkdtemp(prefix="stub-test-media-"),
+    "TOOLS_CONFIG_FILE": "",
+    "WEB_CONCURRENCY": "1",
+    # One slot per model with a short queue, so contention is easy to set up
+    "SCHEDULER_CONCURRENCY_LLM": "1",
+    "SCHEDULER_CONCURRENCY_IMAGE": "1",
+    "SCHEDULER_MAX_QUEUE": "5",
+    "EXECUTION_WRITE_BEHIND": "true",
+    "EXECUTION_FLUSH_INTERVAL": "0.01"
+})
+
+import replicate_stub
+import server
+from bson import encode as bson_encode
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DocumentTooLarge
+
+replicate_stub.STUB_LATENCY = 0.3
+replicate_stub.STUB_STREAM = False
+
+# MongoDB's limit, which mongomock does not enforce
+MAX_BSON_SIZE = 16 * 1024 * 1024
+
+class SizeLimitedCollection:
+    """A mongomock collection that refuses oversized documents like pymongo"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def check(self, documents):
+        for document in documents:
+            if len(bson_encode(document)) > MAX_BSON_SIZE:
+                raise DocumentTooLarge("BSON document too large")
+
+    async def insert_one(self, document, *args, **kwargs):
+        self.check([document])
+        return await self.collection.insert_one(document, *args, **kwargs)
+
+    async def insert_many(self, documents, *args, **kwargs):
+        self.check(documents)
+        return await self.collection.insert_many(documents, *args, **kwargs)
+
+class SizeLimitedDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getattr__(self, name):
+        return SizeLimitedCollection(getattr(self.database, name))
+
+    def __getitem__(self, name):
+        return SizeLimitedCollection(self.database[name])
+
+class StubTester:
+    def __init__(self, http):
+        self.http = http
+        self.test_results = []
+
+    def log_test(self, test_name: str, success: bool, details: str = ""):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}")
+        if details:
+            print(f"   Details: {details}")
+        self.test_results.append({
+            "test": test_name,
+            "success": success,
+            "details": details
+        })
+
+    def stub_predictions(self, marker):
+        """Predictions the stub received whose prompt contains ``marker``, in creation order"""
+        return [
+            prediction for prediction in replicate_stub.predictions.values()
+            if marker in str(prediction["input"].get("prompt", ""))
+        ]
+
+    async def until_holding(self, limiter, count):
+        """Wait until ``count`` calls are running on or queued at ``limiter``"""
+        deadline = time.monotonic() + 5
+        while limiter.active + limiter.queued < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+
+    async def create_project(self, name):
+        response = await self.http.post("/projects", json={"name": name, "description": "Stub test project"})
+        response.raise_for_status()
+        return response.json()["project"]["id"]
+
+    async def test_cancelled_waiter_popped_by_release(self):
+        """Test a waiter cancelled after release() popped it is not uncounted twice"""
+        limiter = server.FairLimiter("stub/test", 1, 5)
+        await limiter.acquire("project-a")
+        cancelled = asyncio.create_task(limiter.acquire("project-b"))
+        waiting = asyncio.create_task(limiter.acquire("project-c"))
+        await asyncio.sleep(0)
+        # Cancelling the task cancels its future at once, but its except
+        # branch only runs after release() has already popped that future
+        cancelled.cancel()
+        limiter.release()
+        await asyncio.gather(cancelled, waiting, return_exceptions=True)
+
+        state = {"active": limiter.active, "queued": limiter.queued, "lanes": len(limiter.lanes)}
+        handed_over = cancelled.cancelled() and waiting.done() and waiting.exception() is None
+        limiter.release()
+        if handed_over and state == {"active": 1, "queued": 0, "lanes": 0} and limiter.active == 0:
+            self.log_test("Cancelled Waiter Popped By Release", True, "Slot went to the next project, counts intact")
+        else:
+            error = None if cancelled.cancelled() else cancelled.exception()
+            self.log_test("Cancelled Waiter Popped By Release", False, f"State after release: {state}, cancelled waiter: {error!r}")
+
+    async def test_projects_alternate(self):
+        """Test two projects queued on a 1-slot model take turns"""
+        marker = f"rotation-{uuid.uuid4().hex[:8]}"
+        projects = {"A": await self.create_project("Rotation A"), "B": await self.create_project("Rotation B")}
+
+        async def execute(label):
+            return await self.http.post("/tools/execute", json={
+                "tool_name": "Brainstorm Ideas",
+                "inputs": {"prompt": f"{marker} {label}", "genre": "noir"},
+                "project_id": projects[label[0]]
+            })
+
+        # A1 takes the slot; the rest queue in this order
+        limiter = server.get_model_limiter(server.find_tool("Brainstorm Ideas").replicate_model)
+        tasks = []
+        for label in ["A1", "A2", "A3", "A4", "B1", "B2"]:
+            tasks.append(asyncio.create_task(execute(label)))
+            await self.until_holding(limiter, len(tasks))
+        responses = await asyncio.gather(*tasks)
+
+        order = [prediction["input"]["prompt"].split()[-1] for prediction in self.stub_predictions(marker)]
+        statuses = [response.status_code for response in responses]
+        expected = ["A1", "A2", "B1", "A3", "B2", "A4"]
+        if statuses == [200] * 6 and order == expected:
+            self.log_test("Projects Alternate Under Limit 1", True, f"Admitted {' '.join(order)}")
+        else:
+            self.log_test("Projects Alternate Under Limit 1", False, f"Admitted {order}, expected {expected}; statuses {statuses}")
+
+    async def test_full_queue_retry_after(self):
+        """Test a request beyond SCHEDULER_MAX_QUEUE gets a 429 with Retry-After"""
+        marker = f"backpressure-{uuid.uuid4().hex[:8]}"
+
+        async def execute(index):
+            # Unseeded image inputs are never cached or coalesced
+            return await self.http.post("/tools/execute", json={
+                "tool_name": "Character Builder",
+                "inputs": {"prompt": f"{marker} {index}", "style": "Realistic"}
+            })
+
+        # One running and SCHEDULER_MAX_QUEUE waiting
+        limiter = server.get_model_limiter(server.find_tool("Character Builder").replicate_model)
+        tasks = [asyncio.create_task(execute(index)) for index in range(1 + server.SCHEDULER_MAX_QUEUE)]
+        await self.until_holding(limiter, len(tasks))
+        rejected = await execute("overflow")
+        statuses = [response.status_code for response in await asyncio.gather(*tasks)]
+
+        retry_after = rejected.headers.get("Retry-After", "")
+        if rejected.status_code == 429 and retry_after.isdigit() and int(retry_after) >= 1 and statuses == [200] * len(tasks):
+            self.log_test("Full Queue Retry-After", True, f"429 with Retry-After: {retry_after}")
+        else:
+            self.log_test("Full Queue Retry-After", False, f"Overflow got {rejected.status_code} (Retry-After {retry_after!r}); queued got {statuses}")
+
+    async def test_single_flight_cancellation(self):
+        """Test an identical request arriving while the shared task unwinds starts afresh"""
+        tool = server.find_tool("Brainstorm Ideas")
+        marker = f"single-flight-{uuid.uuid4().hex[:8]}"
+        inputs = {"prompt": marker, "genre": "noir"}
+        key = server.cache_key(tool.replicate_model, inputs)
+
+        first = asyncio.create_task(server.run_tool(tool, inputs))
+        deadline = time.monotonic() + 5
+        while not self.stub_predictions(marker) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        call = server.singleflight.calls.get(key)
+        first.cancel()
+        while server.singleflight.calls.get(key) is call and not first.done():
+            await asyncio.sleep(0)
+        # The shared task is still cancelling its prediction at the stub
+        unwinding = call is not None and not call["task"].done()
+
+        try:
+            result, cache_status = await asyncio.wait_for(server.run_tool(tool, inputs), 10)
+        except asyncio.CancelledError:
+            self.log_test("Single-Flight Cancellation", False, "Identical request joined the cancelled task")
+            return
+        statuses = [prediction["status"] for prediction in self.stub_predictions(marker)]
+        if unwinding and first.cancelled() and cache_status == "miss" and marker in result and statuses == ["canceled", "succeeded"]:
+            self.log_test("Single-Flight Cancellation", True, "Second request ran its own prediction")
+        else:
+            self.log_test("Single-Flight Cancellation", False, f"Unwinding: {unwinding}, cache: {cache_status}, predictions: {statuses}")
+
+    async def test_dead_lettered_execution(self):
+        """Test one record Mongo refuses does not block the records queued after it"""
+        log = server.ExecutionLog(batch_size=4, interval=0.01, max_queued=8)
+        log.start()
+        try:
+            def record(result):
+                return {
+                    "id": str(uuid.uuid4()),
+                    "tool_name": "Script Writer",
+                    "inputs": {"prompt": "dead letter test"},
+                    "result": result,
+                    "result_media": None,
+                    "result_bytes": len(result),
+                    "project_id": None,
+                    "created_at": server.utcnow(),
+                    "is_demo": False
+                }
+
+            bad = record("x" * (MAX_BSON_SIZE + 1))
+            good = [record(f"scene {index}") for index in range(20)]
+            # 20 good records behind the bad one overflow the 8-record queue,
+            # so add() only returns if the bad record gets out of the way
+            await asyncio.wait_for(log.add([good[0], bad, *good[1:3]]), 5)
+            for item in good[3:]:
+                await asyncio.wait_for(log.add([item]), 5)
+            deadline = time.monotonic() + 5
+            while log.queue and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+
+            stored = {
+                doc["id"] async for doc in server.db.executions.find(
+                    {"id": {"$in": [item["id"] for item in [bad, *good]]}}, {"id": 1}
+                )
+            }
+            stats = log.stats()
+            if (stats["dead_lettered"] == 1 and stats["queued"] == 0 and bad["id"] not in stored
+                    and stored == {item["id"] for item in good} and bad["id"] not in log.pending):
+                self.log_test("Dead-Lettered Execution", True, f"{stats['written']} written, 1 dead-lettered")
+            else:
+                self.log_test("Dead-Lettered Execution", False, f"Stats: {stats}, stored {len(stored)} of {len(good)}")
+        except asyncio.TimeoutError:
+            self.log_test("Dead-Lettered Execution", False, f"Queue stayed blocked: {log.stats()}")
+        finally:
+            await log.close()
+
+    async def run_all_tests(self):
+        """Run all in-process tests"""
+        print("🚀 Starting in-process tests against the Replicate stub")
+        print("=" * 60)
+
+        print("\n🚦 Testing Scheduler...")
+        await self.test_cancelled_waiter_popped_by_release()
+        await self.test_projects_alternate()
+        await self.test_full_queue_retry_after()
+
+        print("\n🔀 Testing Single-Flight...")
+        await self.test_single_flight_cancellation()
+
+        print("\n🗄️  Testing Write-Behind Execution Log...")
+        await self.test_dead_lettered_execution()
+
+        print("\n" + "=" * 60)
+        passed = sum(1 for result in self.test_results if result["success"])
+        total = len(self.test_results)
+        print(f"Total Tests: {total}")
+        print(f"Passed: {passed}")
+        print(f"Failed: {total - passed}")
+        return passed == total
+
+async def start_server(app, port):
+    """Serve an ASGI app on loopback from the running event loop"""
+    server_ = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_.install_signal_handlers = lambda: None
+    task = asyncio.create_task(server_.serve())
+    while not server_.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server_, task
+
+async def main():
+    server.client = AsyncMongoMockClient(tz_aware=True)
+    server.db = SizeLimitedDatabase(server.client[os.environ["DATABASE_NAME"]])
+    server.result_cache.collection = server.db.result_cache
+
+    stub = await start_server(replicate_stub.app, STUB_PORT)
+    api = await start_server(server.app, API_PORT)
+    http = httpx.AsyncClient(base_url=f"http://127.0.0.1:{API_PORT}/api", timeout=30)
+    try:
+        return await StubTester(http).run_all_tests()
+    finally:
+        await http.aclose()
+        for server_, task in (api, stub):
+            server_.should_exit = True
+            await task
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
@@ -5,6 +5,7 @@ Tests all core API endpoints with realistic data and AI integration
 """
 
 import requests
+import base64
 import json
 import uuid
 import time
@@ -300,23 +301,42 @@ class BackendTester:
             self.log_test("Brainstorm Ideas Response Format", False, f"Exception: {str(e)}")
 
     def test_brainstorm_ideas_malformed_requests(self):
-        """Test Brainstorm Ideas error handling for malformed requests"""
+        """Test Brainstorm Ideas rejects malformed requests with a 422 naming the field"""
         test_cases = [
             {
                 "name": "Missing inputs",
-                "payload": {"tool_name": "Brainstorm Ideas"}
+                "payload": {"tool_name": "Brainstorm Ideas"},
+                "status": 422,
+                "loc": ["body", "inputs"]
             },
             {
                 "name": "Missing prompt",
-                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"genre": "cinematic"}}
+                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"genre": "cinematic"}},
+                "status": 422,
+                "loc": ["inputs", "prompt"]
             },
             {
                 "name": "Missing genre", 
-                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"prompt": "test"}}
+                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"prompt": "test"}},
+                "status": 200
             },
             {
                 "name": "Empty inputs",
-                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {}}
+                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {}},
+                "status": 422,
+                "loc": ["inputs", "prompt"]
+            },
+            {
+                "name": "Oversized undeclared input",
+                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"prompt": "test", "notes": "x" * 10001}},
+                "status": 422,
+                "loc": ["inputs", "notes"]
+            },
+            {
+                "name": "Nested undeclared input",
+                "payload": {"tool_name": "Brainstorm Ideas", "inputs": {"prompt": "test", "notes": {"scene": "x"}}},
+                "status": 422,
+                "loc": ["inputs", "notes"]
             }
         ]
         
@@ -324,22 +344,58 @@ class BackendTester:
             try:
                 response = self.session.post(f"{self.base_url}/tools/execute", json=test_case["payload"])
                 
-                # Should either handle gracefully (200) or return proper error (400/422/500)
-                if response.status_code in [200, 400, 422, 500]:
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("success"):
-                            self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", True, "Handled gracefully")
-                        else:
-                            self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", True, "Returned error response")
+                if response.status_code != test_case["status"]:
+                    self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", False, f"Expected {test_case['status']}, got {response.status_code}: {response.text}")
+                elif "loc" in test_case:
+                    locs = [error.get("loc") for error in response.json().get("detail", [])]
+                    if test_case["loc"] in locs:
+                        self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", True, f"422 for {test_case['loc']}")
                     else:
-                        self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", True, f"Proper error status: {response.status_code}")
+                        self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", False, f"Expected an error at {test_case['loc']}, got {locs}")
                 else:
-                    self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", False, f"Unexpected status: {response.status_code}")
+                    self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", True, "Handled gracefully")
                     
             except Exception as e:
                 self.log_test(f"Brainstorm Ideas Error Handling - {test_case['name']}", False, f"Exception: {str(e)}")
 
+    def test_media_input_validation(self):
+        """Test media inputs of the wrong kind, unknown handles and oversized inline data get a 422"""
+        oversized = "data:image/png;base64," + base64.b64encode(b"\0" * (11 * 1024 * 1024)).decode()
+        test_cases = [
+            {
+                "name": "Wrong media kind",
+                "inputs": {"image": "data:audio/wav;base64,UklGRgAAAABXQVZF"},
+                "type": "value_error"
+            },
+            {
+                "name": "Unknown media handle",
+                "inputs": {"image": f"/api/media/{'0' * 64}"},
+                "type": "media_missing"
+            },
+            {
+                "name": "Oversized inline media",
+                "inputs": {"image": oversized},
+                "type": "value_error"
+            }
+        ]
+        
+        for test_case in test_cases:
+            try:
+                payload = {"tool_name": "Animation", "inputs": test_case["inputs"]}
+                response = self.session.post(f"{self.base_url}/tools/execute", json=payload)
+                
+                if response.status_code != 422:
+                    self.log_test(f"Media Input Validation - {test_case['name']}", False, f"Expected 422, got {response.status_code}")
+                    continue
+                errors = response.json().get("detail", [])
+                if any(error.get("loc") == ["inputs", "image"] and error.get("type") == test_case["type"] for error in errors):
+                    self.log_test(f"Media Input Validation - {test_case['name']}", True, errors[0].get("msg", ""))
+                else:
+                    self.log_test(f"Media Input Validation - {test_case['name']}", False, f"Unexpected errors: {errors}")
+                    
+            except Exception as e:
+                self.log_test(f"Media Input Validation - {test_case['name']}", False, f"Exception: {str(e)}")
+
     def test_character_builder_execution(self):
         """Test Character Builder tool execution with image generation"""
         try:
@@ -484,6 +540,88 @@ class BackendTester:
         except Exception as e:
             self.log_test("Invalid Project ID Handling", False, f"Exception: {str(e)}")
             
+    def test_project_execution_paging(self):
+        """Test paging a project's executions with after/next_cursor and fetching one in full"""
+        try:
+            response = self.session.post(f"{self.base_url}/projects", json={
+                "name": "Paging Test",
+                "description": "Holds enough executions for several pages"
+            })
+            if response.status_code != 200:
+                self.log_test("Project Execution Paging", False, f"Project creation failed: {response.status_code}")
+                return
+            project_id = response.json()["project"]["id"]
+            
+            executed = {}
+            for index in range(5):
+                response = self.session.post(f"{self.base_url}/tools/execute", json={
+                    "tool_name": "Script Writer",
+                    "inputs": {"prompt": f"Paging scene {index} {uuid.uuid4()}"},
+                    "project_id": project_id
+                })
+                if response.status_code != 200:
+                    self.log_test("Project Execution Paging", False, f"Execution failed: {response.status_code}")
+                    return
+                executed[response.json()["execution_id"]] = response.json()["result"]
+                
+            seen, pages, cursor = [], 0, None
+            while True:
+                params = {"limit": 2, **({"after": cursor} if cursor else {})}
+                page = self.session.get(f"{self.base_url}/projects/{project_id}", params=params).json()
+                pages += 1
+                seen.extend(execution["id"] for execution in page["executions"])
+                cursor = page.get("next_cursor")
+                if not cursor or pages > 10:
+                    break
+                    
+            if pages < 3 or sorted(seen) != sorted(executed):
+                self.log_test("Project Execution Paging", False, f"{pages} pages, saw {len(seen)} ids ({len(set(seen))} unique) of {len(executed)}")
+                return
+                
+            execution_id, result = next(iter(executed.items()))
+            response = self.session.get(f"{self.base_url}/executions/{execution_id}")
+            execution = response.json().get("execution", {}) if response.status_code == 200 else {}
+            if execution.get("result") == result and execution.get("inputs", {}).get("prompt", "").startswith("Paging scene"):
+                self.log_test("Project Execution Paging", True, f"{len(seen)} executions over {pages} pages; full payload by id")
+            else:
+                self.log_test("Project Execution Paging", False, f"Execution {execution_id} lookup: {response.status_code} {execution}")
+                
+        except Exception as e:
+            self.log_test("Project Execution Paging", False, f"Exception: {str(e)}")
+            
+    def test_media_upload(self):
+        """Test POST /api/media deduplicates re-uploads and GET serves byte ranges"""
+        try:
+            content = b"RIFF" + uuid.uuid4().bytes * 256
+            upload = lambda: self.session.post(
+                f"{self.base_url}/media",
+                files={"file": ("clip.wav", content, "audio/wav")}
+            )
+            
+            first = upload()
+            if first.status_code != 201 or first.json().get("deduplicated") is not False:
+                self.log_test("Media Upload", False, f"First upload: {first.status_code} {first.text}")
+                return
+            media = first.json()["media"]
+            if media.get("size") != len(content) or media.get("content_type") != "audio/wav":
+                self.log_test("Media Upload", False, f"Unexpected metadata: {media}")
+                return
+                
+            second = upload()
+            if second.status_code != 201 or not second.json().get("deduplicated") or second.json().get("url") != first.json()["url"]:
+                self.log_test("Media Upload", False, f"Re-upload was not deduplicated: {second.status_code} {second.text}")
+                return
+                
+            response = self.session.get(f"{self.base_url}/media/{media['hash']}", headers={"Range": "bytes=4-19"})
+            if (response.status_code == 206 and response.content == content[4:20]
+                    and response.headers.get("Content-Range") == f"bytes 4-19/{len(content)}"):
+                self.log_test("Media Upload", True, f"Stored {media['hash'][:12]}, deduplicated re-upload, 206 for a range")
+            else:
+                self.log_test("Media Upload", False, f"Range GET: {response.status_code} {response.headers.get('Content-Range')}")
+                
+        except Exception as e:
+            self.log_test("Media Upload", False, f"Exception: {str(e)}")
+            
     def test_replicate_connection(self):
         """Test GET /api/test-replicate"""
         try:
@@ -533,6 +671,77 @@ class BackendTester:
         except Exception as e:
             self.log_test("Tool Execution with Project", False, f"Exception: {str(e)}")
             
+    def test_async_job_execution(self):
+        """Test async-mode execution returns a job id that completes"""
+        try:
+            payload = {
+                "tool_name": "Script Writer",
+                "inputs": {
+                    "prompt": "Write a short opening scene set on a night train",
+                    "system_prompt": "You are a professional screenwriter."
+                },
+                "async_mode": True
+            }
+            
+            response = self.session.post(f"{self.base_url}/tools/execute", json=payload)
+            if response.status_code != 202:
+                self.log_test("Async Job Execution", False, f"Expected 202, got {response.status_code}: {response.text}")
+                return
+                
+            job_id = response.json().get("job_id")
+            job = {}
+            for _ in range(60):
+                job = self.session.get(f"{self.base_url}/jobs/{job_id}").json().get("job", {})
+                if job.get("status") in ("succeeded", "failed"):
+                    break
+                time.sleep(1)
+                
+            if job.get("status") == "succeeded" and job.get("result") and job.get("execution_id"):
+                self.log_test("Async Job Execution", True, f"Job {job_id} succeeded, execution_id: {job.get('execution_id')}")
+            else:
+                self.log_test("Async Job Execution", False, f"Job did not succeed: {job}")
+                
+        except Exception as e:
+            self.log_test("Async Job Execution", False, f"Exception: {str(e)}")
+            
+    def test_write_behind_execution_read(self):
+        """Test an execution is readable by id before and after a write-behind flush"""
+        try:
+            response = self.session.post(f"{self.base_url}/tools/execute", json={
+                "tool_name": "Script Writer",
+                "inputs": {"prompt": f"Write-behind scene {uuid.uuid4()}"}
+            })
+            if response.status_code != 200:
+                self.log_test("Write-Behind Execution Read", False, f"Execution failed: {response.status_code}")
+                return
+            execution_id = response.json()["execution_id"]
+            
+            before = self.session.get(f"{self.base_url}/executions/{execution_id}")
+            if before.status_code != 200 or before.json()["execution"]["id"] != execution_id:
+                self.log_test("Write-Behind Execution Read", False, f"Read before flush: {before.status_code}")
+                return
+                
+            log = self.session.get(f"{self.base_url}/stats").json().get("execution_log", {})
+            for _ in range(50):
+                if not log.get("queued"):
+                    break
+                time.sleep(0.2)
+                log = self.session.get(f"{self.base_url}/stats").json().get("execution_log", {})
+            if log.get("queued"):
+                self.log_test("Write-Behind Execution Read", False, f"Queue did not drain: {log}")
+                return
+                
+            after = self.session.get(f"{self.base_url}/executions/{execution_id}")
+            recent = self.session.get(f"{self.base_url}/executions", params={"limit": 100}).json().get("executions", [])
+            if after.status_code == 200 and any(execution["id"] == execution_id for execution in recent):
+                mode = "write-behind" if log.get("enabled") else "direct writes"
+                self.log_test("Write-Behind Execution Read", True, f"Readable before and after flush ({mode})")
+            else:
+                self.log_test("Write-Behind Execution Read", False, f"Read after flush: {after.status_code}, listed: {len(recent)}")
+                
+        except Exception as e:
+            self.log_test("Write-Behind Execution Read", False, f"Exception: {str(e)}")
+            
     def run_all_tests(self):
         """Run all backend tests"""
         print("🚀 Starting AI Filmmaking Platform Backend API Tests")
@@ -563,6 +772,8 @@ class BackendTester:
         self.test_character_builder_execution()
         self.test_invalid_tool_execution()
         self.test_malformed_tool_request()
+        self.test_media_input_validation()
+        self.test_media_upload()
         
         # Project Management Tests
         print("\n📁 Testing Project Management...")
@@ -570,11 +781,14 @@ class BackendTester:
         self.test_get_projects()
         self.test_get_project_by_id()
         self.test_invalid_project_id()
+        self.test_project_execution_paging()
         
         # AI Integration Tests
         print("\n🤖 Testing AI Integration...")
         self.test_replicate_connection()
         self.test_tool_execution_with_project()
+        self.test_async_job_execution()
+        self.test_write_behind_execution_read()
         
         # Summary
         print("\n" + "=" * 60)
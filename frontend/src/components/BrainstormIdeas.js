@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { motion } from 'framer-motion';
-import axios from 'axios';
+import { streamToolExecution } from '../streamTool';
 
 const BrainstormIdeas = ({ onBack }) => {
   const [currentView, setCurrentView] = useState('boards'); // 'boards' or 'canvas'
@@ -173,38 +173,40 @@ const BrainstormIdeas = ({ onBack }) => {
 
   const generateIdeas = async (mood = 'general') => {
     setLoading(true);
+    const noteId = Date.now();
     try {
-      const response = await axios.post(`${backendUrl}/api/tools/execute`, {
-        tool_name: 'Brainstorm Ideas',
-        inputs: {
-          prompt: `Generate creative film ideas with a ${mood} style`,
-          genre: mood
-        }
-      });
-
-      // Add generated ideas as notes to canvas
-      const ideas = response.data.result.result || response.data.result;
-      const newNote = {
-        id: Date.now(),
+      // Add the note straight away and fill it in as ideas stream back
+      setCanvasItems(prev => [...prev, {
+        id: noteId,
         type: 'note',
-        content: ideas,
+        content: '',
         x: Math.random() * 400 + 100,
         y: Math.random() * 300 + 100,
         width: 320,
         height: 240,
         color: 'bg-yellow-200'
-      };
-
-      setCanvasItems(prev => [...prev, newNote]);
+      }]);
       
       // If we're in boards view, switch to canvas to show the result
       if (currentView === 'boards') {
         setSelectedBoard({ id: 'generated', name: `${mood.charAt(0).toUpperCase() + mood.slice(1)} Ideas` });
         setCurrentView('canvas');
       }
+
+      await streamToolExecution(backendUrl, {
+        tool_name: 'Brainstorm Ideas',
+        inputs: {
+          prompt: `Generate creative film ideas with a ${mood} style`,
+          genre: mood
+        }
+      }, (ideas) => {
+        setCanvasItems(prev => prev.map(item => (
+          item.id === noteId ? { ...item, content: ideas } : item
+        )));
+      });
     } catch (error) {
       console.error('Error generating ideas:', error);
-      // Add error note instead
+      // Replace the streaming note with an error note
       const errorNote = {
         id: Date.now(),
         type: 'note',
@@ -215,7 +217,7 @@ const BrainstormIdeas = ({ onBack }) => {
         height: 120,
         color: 'bg-red-200'
       };
-      setCanvasItems(prev => [...prev, errorNote]);
+      setCanvasItems(prev => [...prev.filter(item => item.id !== noteId), errorNote]);
     } finally {
       setLoading(false);
     }
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { useDropzone } from 'react-dropzone';
 import axios from 'axios';
+import { mediaRenditionUrl } from '../media';
 
 const CharacterBuilder = ({ onBack }) => {
   const [characterPrompt, setCharacterPrompt] = useState('');
@@ -68,7 +69,7 @@ const CharacterBuilder = ({ onBack }) => {
       });
 
       setGeneratedCharacter({
-        image: response.data.result.result || response.data.result,
+        image: mediaRenditionUrl(backendUrl, response.data.result.result || response.data.result, 'medium'),
         prompt: characterPrompt,
         settings: {
           style: selectedStyle,
@@ -1,10 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import axios from 'axios';
+import { mediaRenditionUrl } from '../media';
 
 const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
   const [projects, setProjects] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showCreateModal, setShowCreateModal] = useState(false);
   const [newProject, setNewProject] = useState({
     name: '',
@@ -22,6 +25,7 @@ const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
       setLoading(true);
       const response = await axios.get(`${backendUrl}/api/projects`);
       setProjects(response.data.projects);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching projects:', error);
     } finally {
@@ -29,6 +33,23 @@ const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
     }
   };
 
+  // Fetch the page after the last project we have (keyset pagination)
+  const loadMoreProjects = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${backendUrl}/api/projects`, {
+        params: { after: nextCursor }
+      });
+      setProjects(prev => [...prev, ...response.data.projects]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more projects:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const createProject = async () => {
     try {
       const response = await axios.post(`${backendUrl}/api/projects`, newProject);
@@ -98,16 +119,25 @@ const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
               key={project.id}
               initial={{ opacity: 0, y: 20 }}
               animate={{ opacity: 1, y: 0 }}
-              transition={{ delay: index * 0.1 }}
+              transition={{ delay: (index % 12) * 0.1 }}
               className="tool-card p-6 cursor-pointer"
               onClick={() => onProjectSelect(project)}
               whileHover={{ scale: 1.02 }}
               whileTap={{ scale: 0.98 }}
             >
               <div className="flex items-center justify-between mb-4">
-                <div className="w-12 h-12 bg-gradient-to-r from-blue-500 to-purple-600 rounded-lg flex items-center justify-center">
-                  <span className="text-white text-xl">🎬</span>
-                </div>
+                {project.stats?.last_result?.result_media?.content_type?.startsWith('image/') ? (
+                  <img
+                    src={mediaRenditionUrl(backendUrl, `/api/media/${project.stats.last_result.result_media.hash}`, 'thumb')}
+                    alt={project.stats.last_result.tool_name}
+                    loading="lazy"
+                    className="w-12 h-12 rounded-lg object-cover"
+                  />
+                ) : (
+                  <div className="w-12 h-12 bg-gradient-to-r from-blue-500 to-purple-600 rounded-lg flex items-center justify-center">
+                    <span className="text-white text-xl">🎬</span>
+                  </div>
+                )}
                 <span className="text-xs text-gray-500">
                   {formatDate(project.created_at)}
                 </span>
@@ -123,7 +153,7 @@ const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
               
               <div className="flex items-center justify-between">
                 <span className="text-xs text-gray-500">
-                  {project.tools_used.length} tools used
+                  {project.tools_used.length} tools used · {project.stats?.executions || 0} runs
                 </span>
                 <motion.button
                   className="text-blue-600 hover:text-blue-700 font-medium text-sm"
@@ -137,6 +167,20 @@ const ProjectDashboard = ({ onProjectSelect, currentProject }) => {
         </div>
       )}
 
+      {nextCursor && (
+        <div className="flex justify-center mt-8">
+          <motion.button
+            onClick={loadMoreProjects}
+            className="btn-secondary"
+            whileHover={{ scale: 1.05 }}
+            whileTap={{ scale: 0.95 }}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : 'Load More Projects'}
+          </motion.button>
+        </div>
+      )}
+
       {/* Create Project Modal */}
       {showCreateModal && (
         <div className="fixed inset-0 bg-black/50 flex items-center justify-center z-50">
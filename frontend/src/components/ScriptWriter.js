@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { motion } from 'framer-motion';
-import axios from 'axios';
+import { streamToolExecution } from '../streamTool';
 
 const ScriptWriter = ({ onBack }) => {
   const [messages, setMessages] = useState([]);
@@ -54,32 +54,30 @@ What kind of script would you like to work on today?`,
     setInputValue('');
     setIsGenerating(true);
 
+    // Show tokens as soon as the model produces them
+    const assistantId = (Date.now() + 1).toString();
+    const updateAssistant = (content) => {
+      setMessages(prev => {
+        if (!prev.some(message => message.id === assistantId)) {
+          return [...prev, { id: assistantId, type: 'assistant', content, timestamp: new Date() }];
+        }
+        return prev.map(message => (
+          message.id === assistantId ? { ...message, content } : message
+        ));
+      });
+    };
+
     try {
-      const response = await axios.post(`${backendUrl}/api/tools/execute`, {
+      await streamToolExecution(backendUrl, {
         tool_name: 'Script Writer',
         inputs: {
           prompt: inputValue,
           system_prompt: 'You are a professional screenwriter and script writing assistant. Help create engaging, well-formatted scripts with proper screenplay format, dialogue, and scene descriptions.'
         }
-      });
-
-      const assistantMessage = {
-        id: (Date.now() + 1).toString(),
-        type: 'assistant',
-        content: response.data.result.result || response.data.result,
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, assistantMessage]);
+      }, updateAssistant);
     } catch (error) {
       console.error('Error generating script:', error);
-      const errorMessage = {
-        id: (Date.now() + 1).toString(),
-        type: 'assistant',
-        content: 'Sorry, I encountered an error while generating your script. Please try again.',
-        timestamp: new Date()
-      };
-      setMessages(prev => [...prev, errorMessage]);
+      updateAssistant('Sorry, I encountered an error while generating your script. Please try again.');
     } finally {
       setIsGenerating(false);
     }
@@ -218,7 +216,7 @@ What kind of script would you like to work on today?`,
               </motion.div>
             ))}
             
-            {isGenerating && (
+            {isGenerating && messages[messages.length - 1]?.type === 'user' && (
               <motion.div
                 initial={{ opacity: 0, y: 20 }}
                 animate={{ opacity: 1, y: 0 }}
@@ -7,12 +7,21 @@ import ScriptWriter from './ScriptWriter';
 import CharacterBuilder from './CharacterBuilder';
 import StoryboardBuilder from './StoryboardBuilder';
 import BrainstormIdeas from './BrainstormIdeas';
+import { mediaRenditionUrl, resolveMediaUrl, uploadMedia } from '../media';
+
+// Validation errors (422) come back as a list of {loc, msg}; show them as text
+const describeError = (detail) => (
+  Array.isArray(detail)
+    ? detail.map(item => `${item.loc?.[item.loc.length - 1] ?? 'input'}: ${item.msg}`).join('; ')
+    : detail
+);
 
 const ToolInterface = ({ tool, onBack }) => {
   const [inputs, setInputs] = useState({});
   const [result, setResult] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [uploading, setUploading] = useState(0);
 
   // If it's the Brainstorm Ideas tool, render the dedicated Brainstorm Ideas module
   if (tool.name === 'Brainstorm Ideas') {
@@ -48,14 +57,21 @@ const ToolInterface = ({ tool, onBack }) => {
     }));
   };
 
-  const handleFileUpload = (key, file) => {
-    const reader = new FileReader();
-    reader.onload = (e) => {
-      handleInputChange(key, e.target.result);
-    };
-    reader.readAsDataURL(file);
+  const handleFileUpload = async (key, file) => {
+    try {
+      setUploading(count => count + 1);
+      setError(null);
+      handleInputChange(key, await uploadMedia(backendUrl, file));
+    } catch (error) {
+      console.error('Error uploading file:', error);
+      setError(describeError(error.response?.data?.detail) || 'Failed to upload file');
+    } finally {
+      setUploading(count => count - 1);
+    }
   };
 
+  const busy = loading || uploading > 0;
+
   const executeTool = async () => {
     try {
       setLoading(true);
@@ -69,7 +85,7 @@ const ToolInterface = ({ tool, onBack }) => {
       setResult(response.data);
     } catch (error) {
       console.error('Error executing tool:', error);
-      setError(error.response?.data?.detail || 'Failed to execute tool');
+      setError(describeError(error.response?.data?.detail) || 'Failed to execute tool');
     } finally {
       setLoading(false);
     }
@@ -109,7 +125,7 @@ const ToolInterface = ({ tool, onBack }) => {
             key={key}
             onFileUpload={(file) => handleFileUpload(key, file)}
             acceptedTypes={type === 'image' ? 'image/*' : type === 'video' ? 'video/*' : 'audio/*'}
-            label={`Upload ${key}`}
+            label={inputs[key] ? `Uploaded ${key}; drop another file to replace it` : `Upload ${key}`}
           />
         );
       
@@ -205,15 +221,15 @@ const ToolInterface = ({ tool, onBack }) => {
         <div className="mt-8">
           <motion.button
             onClick={executeTool}
-            disabled={loading}
-            className={`btn-primary w-full py-4 text-lg ${loading ? 'opacity-50 cursor-not-allowed' : ''}`}
-            whileHover={!loading ? { scale: 1.02 } : {}}
-            whileTap={!loading ? { scale: 0.98 } : {}}
+            disabled={busy}
+            className={`btn-primary w-full py-4 text-lg ${busy ? 'opacity-50 cursor-not-allowed' : ''}`}
+            whileHover={!busy ? { scale: 1.02 } : {}}
+            whileTap={!busy ? { scale: 0.98 } : {}}
           >
-            {loading ? (
+            {busy ? (
               <div className="flex items-center justify-center">
                 <div className="animate-spin rounded-full h-5 w-5 border-b-2 border-white mr-2"></div>
-                Processing...
+                {uploading ? 'Uploading...' : 'Processing...'}
               </div>
             ) : (
               `Execute ${tool.name}`
@@ -232,13 +248,15 @@ const ToolInterface = ({ tool, onBack }) => {
           <h2 className="text-2xl font-bold text-gray-900 mb-6">Result</h2>
           
           <div className="bg-gray-50 rounded-lg p-6">
-            {typeof result.result === 'string' && result.result.startsWith('data:image') ? (
-              <img src={result.result} alt="Generated result" className="max-w-full h-auto rounded-lg" />
-            ) : typeof result.result === 'string' && result.result.startsWith('http') ? (
+            {typeof result.result === 'string' && (result.result.startsWith('data:image') || result.result_media?.content_type?.startsWith('image/')) ? (
+              <a href={resolveMediaUrl(backendUrl, result.result)} target="_blank" rel="noopener noreferrer">
+                <img src={mediaRenditionUrl(backendUrl, result.result, 'medium')} alt="Generated result" className="max-w-full h-auto rounded-lg" />
+              </a>
+            ) : typeof result.result === 'string' && (result.result.startsWith('http') || result.result_media) ? (
               <div className="space-y-4">
                 <p className="text-sm text-gray-600">Generated content URL:</p>
                 <a 
-                  href={result.result} 
+                  href={resolveMediaUrl(backendUrl, result.result)} 
                   target="_blank" 
                   rel="noopener noreferrer"
                   className="text-blue-600 hover:text-blue-800 break-all"
@@ -0,0 +1,24 @@
+import axios from 'axios';
+
+// Stored media comes back as a path on the API (/api/media/<hash>); turn it
+// into a URL the browser can load.
+export const resolveMediaUrl = (backendUrl, value) => (
+  typeof value === 'string' && value.startsWith('/api/') ? `${backendUrl}${value}` : value
+);
+
+// A downscaled rendition ('thumb' or 'medium') of a stored image; other
+// values are resolved unchanged. The API picks AVIF/WebP from Accept.
+export const mediaRenditionUrl = (backendUrl, value, size) => (
+  typeof value === 'string' && value.startsWith('/api/media/')
+    ? `${backendUrl}${value}?size=${size}`
+    : resolveMediaUrl(backendUrl, value)
+);
+
+// Upload a file to the media store and return the handle to pass as a tool
+// input. The file is sent as-is rather than base64-encoded into JSON.
+export const uploadMedia = async (backendUrl, file) => {
+  const form = new FormData();
+  form.append('file', file);
+  const response = await axios.post(`${backendUrl}/api/media`, form);
+  return response.data.url;
+};
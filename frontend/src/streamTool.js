@@ -0,0 +1,51 @@
+// Run a tool through POST /api/tools/execute/stream and report tokens as they
+// arrive. Resolves with the full result once the server sends its `done` event.
+export const streamToolExecution = async (backendUrl, payload, onToken) => {
+  const response = await fetch(`${backendUrl}/api/tools/execute/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload)
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Tool execution failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      const parsed = data ? JSON.parse(data) : {};
+
+      if (event === 'token') {
+        result += parsed.token;
+        onToken(result);
+      } else if (event === 'done') {
+        return { ...parsed, result };
+      } else if (event === 'error') {
+        throw new Error(parsed.detail || 'Tool execution failed');
+      }
+    }
+  }
+
+  throw new Error('Stream ended before the tool finished');
+};